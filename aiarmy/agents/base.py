@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import asyncio
+import sqlite3
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from typing import Any, Literal, cast
 
@@ -8,10 +12,10 @@ import anthropic
 from rich.console import Console
 
 from ..core.config import config
+from ..core.long_term_memory import LongTermMemory
 from ..core.memory import SessionMemory
-from ..core.budget import BudgetTracker
+from ..core.budget import BudgetTracker, TokenUsage
 from ..core.audit import log_action
-from ..core.compactor import ContextCompactor
 from ..core.security import (
     SecurityError,
     request_human_approval,
@@ -19,6 +23,9 @@ from ..core.security import (
     validate_input,
 )
 from ..core.claude_session import ClaudeSessionClient
+from ..core.clients import ClientProvider, get_provider
+from ..tools.executor import AsyncToolBatch, ToolBatch
+from ..tools.registry import acall as tool_acall
 from ..tools.registry import call as tool_call
 from ..tools.registry import get_tools_for_agent
 
@@ -33,6 +40,69 @@ class AgentResult:
     metadata: dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class AgentEvent:
+    type: Literal["text", "tool_use", "tool_result"]
+    text: str = ""
+    tool_name: str = ""
+    tool_input: dict[str, Any] = field(default_factory=dict)
+    is_error: bool = False
+
+
+EventHandler = Callable[[AgentEvent], None]
+
+_EPHEMERAL = {"type": "ephemeral"}
+_REJECTED = "Rejected by human approval gate."
+
+# (result text, is_error, approved, latency_ms)
+ToolOutcome = tuple[str, bool, bool, int]
+
+
+@dataclass
+class RunState:
+    """One run in progress: the request being built and what it has used."""
+
+    safe_task: str
+    prompt: str
+    # What is actually sent for this turn: ``prompt`` plus recalled notes.
+    request_prompt: str
+    system_prompt: str
+    tools: list[dict[str, Any]]
+    messages: list[dict[str, Any]]
+    history_len: int
+    usage: TokenUsage = field(default_factory=TokenUsage)
+    timing: dict[str, float] = field(
+        default_factory=lambda: {"start": time.perf_counter()}
+    )
+    # Whether the exchange is added to the session memory.
+    record: bool = True
+
+
+def _elapsed_ms(start: float) -> int:
+    return round((time.perf_counter() - start) * 1000)
+
+
+def _final_text(response: Any) -> str:
+    text_blocks = [b for b in response.content if b.type == "text"]
+    if text_blocks:
+        return "\n".join(block.text for block in text_blocks)
+    if response.stop_reason == "tool_use":
+        return "Stopped after reaching max tool-use turns."
+    return "(no text response)"
+
+
+def _with_cache_control(message: dict[str, Any]) -> dict[str, Any]:
+    content = message["content"]
+    if isinstance(content, str):
+        blocks: list[Any] = [{"type": "text", "text": content}]
+    else:
+        blocks = list(content)
+    if not blocks or not isinstance(blocks[-1], dict):
+        return message
+    blocks[-1] = {**blocks[-1], "cache_control": _EPHEMERAL}
+    return {**message, "content": blocks}
+
+
 class BaseAgent(ABC):
     name: str
     role: str
@@ -40,28 +110,136 @@ class BaseAgent(ABC):
     system_prompt: str
     allowed_tools: list[str] = []
 
-    def __init__(self, session_id: str, budget: BudgetTracker, memory: SessionMemory):
+    def __init__(
+        self,
+        session_id: str,
+        budget: BudgetTracker,
+        memory: SessionMemory,
+        clients: ClientProvider | None = None,
+        long_term: LongTermMemory | None = None,
+    ):
         self.session_id = session_id
         self.budget = budget
         self.memory = memory
+        self.clients = clients if clients is not None else get_provider()
+        # Store searched for recall; the one SessionManager writes to.
+        self.long_term = long_term
 
+        self._client: anthropic.Anthropic | None
+        self._session_client: ClaudeSessionClient | None
         if config.AUTH_MODE == "api_key":
-            self._client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY)
+            self._client = self.clients.anthropic
             self._session_client = None
         elif config.AUTH_MODE == "session_key":
             self._client = None
-            self._session_client = ClaudeSessionClient(config.CLAUDE_SESSION_KEY)
+            self._session_client = self.clients.session_client()
         else:
             raise ValueError(f"Invalid AUTH_MODE: {config.AUTH_MODE}")
 
-        if self._client:
-            self.compactor = ContextCompactor(self._client, threshold_tokens=15000)
-        else:
-            self.compactor = None
+        self.compactor = self.clients.compactor
+
+    def run(
+        self,
+        task: str,
+        context: str = "",
+        on_event: EventHandler | None = None,
+        record: bool = True,
+    ) -> AgentResult:
+        """Answer ``task``; with ``record=False`` the exchange is not added to
+        the session memory."""
+        safe_task = self._validate_task(task)
+        if isinstance(safe_task, AgentResult):
+            return safe_task
+
+        state = self._prepare_run(safe_task, context, record)
+        try:
+            if self._client:
+                output = self._run_api(self._client, state, on_event)
+            elif self._session_client:
+                output, tokens = self._session_client.send_message(
+                    prompt=state.request_prompt,
+                    model=self.model,
+                    max_tokens=config.MAX_TOKENS_PER_RUN,
+                    system=self._session_system_prompt(state),
+                    on_text=self._text_handler(on_event, state.timing),
+                )
+                state.usage.tokens += tokens
+            else:
+                raise RuntimeError("No client configured")
+
+        except anthropic.APIError as e:
+            return AgentResult(success=False, content=f"API error: {e}")
+        except RuntimeError as e:
+            return AgentResult(success=False, content=f"Session error: {e}")
+
+        return self._finish_run(state, output)
+
+    async def arun(
+        self,
+        task: str,
+        context: str = "",
+        on_event: EventHandler | None = None,
+        record: bool = True,
+    ) -> AgentResult:
+        safe_task = self._validate_task(task)
+        if isinstance(safe_task, AgentResult):
+            return safe_task
 
-    def run(self, task: str, context: str = "") -> AgentResult:
+        state = self._prepare_run(safe_task, context, record)
         try:
-            safe_task = validate_input(task)
+            if self._client:
+                output = await self._arun_api(
+                    self.clients.async_anthropic(), state, on_event
+                )
+            elif self._session_client:
+                output, tokens = await self._session_client.asend_message(
+                    prompt=state.request_prompt,
+                    model=self.model,
+                    max_tokens=config.MAX_TOKENS_PER_RUN,
+                    system=self._session_system_prompt(state),
+                    on_text=self._text_handler(on_event, state.timing),
+                )
+                state.usage.tokens += tokens
+            else:
+                raise RuntimeError("No client configured")
+
+        except anthropic.APIError as e:
+            return AgentResult(success=False, content=f"API error: {e}")
+        except RuntimeError as e:
+            return AgentResult(success=False, content=f"Session error: {e}")
+
+        return self._finish_run(state, output)
+
+    # Step-by-step form of ``run`` for callers that send the requests
+    # themselves, such as the Message Batches runner.
+
+    def prepare_request(
+        self, task: str, context: str = ""
+    ) -> RunState | AgentResult:
+        """Start a run of ``task``; an ``AgentResult`` means it was rejected.
+
+        Raises ``BudgetExceededError`` like ``run``.
+        """
+        safe_task = self._validate_task(task)
+        if isinstance(safe_task, AgentResult):
+            return safe_task
+        return self._prepare_run(safe_task, context)
+
+    def continue_tool_turn(self, state: RunState, response: Any) -> None:
+        """Run the tools ``response`` asked for and add the turn to ``state``."""
+        tool_batch = ToolBatch(self._execute_tool)
+        for block in response.content:
+            if block.type == "tool_use":
+                tool_batch.add(block)
+        self._append_tool_turn(state, response, tool_batch.results(), None)
+
+    def finish_request(self, state: RunState, response: Any) -> AgentResult:
+        """Record the final ``response`` of a run and return its result."""
+        return self._finish_run(state, _final_text(response))
+
+    def _validate_task(self, task: str) -> str | AgentResult:
+        try:
+            return validate_input(task)
         except SecurityError as e:
             log_action(
                 session_id=self.session_id,
@@ -73,15 +251,20 @@ class BaseAgent(ABC):
             )
             return AgentResult(success=False, content=f"[Security] {e}")
 
-        if self.compactor and self.compactor.should_compact(self.memory):
-            self.compactor.compact(self.memory)
-
+    def _prepare_run(
+        self, safe_task: str, context: str, record: bool = True
+    ) -> RunState:
         self.budget.check_run_budget()
         prompt = self._build_prompt(safe_task, context)
-        tools = get_tools_for_agent(self.allowed_tools)
-        system_prompt_with_context = self._build_system_prompt_with_context()
 
-        raw_messages = self.memory.get_llm_context(max_messages=20)
+        if config.CONTEXT_MAX_TOKENS:
+            raw_messages = self.memory.relevant_context(
+                safe_task,
+                max_tokens=config.CONTEXT_MAX_TOKENS,
+                recent_pairs=config.CONTEXT_RECENT_PAIRS,
+            )
+        else:
+            raw_messages = self.memory.get_llm_context(max_messages=20)
         messages: list[dict[str, Any]] = [
             {
                 "role": cast(Literal["user", "assistant"], m.role),
@@ -89,183 +272,358 @@ class BaseAgent(ABC):
             }
             for m in raw_messages
         ]
-        messages.append({"role": "user", "content": prompt})
+        request_prompt = self._with_recall(safe_task, prompt)
+        messages.append({"role": "user", "content": request_prompt})
+
+        return RunState(
+            safe_task=safe_task,
+            prompt=prompt,
+            request_prompt=request_prompt,
+            system_prompt=self._build_system_prompt_with_context(),
+            tools=get_tools_for_agent(self.allowed_tools),
+            messages=messages,
+            history_len=len(raw_messages),
+            record=record,
+        )
 
-        total_tokens = 0
-        output = "(no text response)"
+    def _finish_run(self, state: RunState, output: str) -> AgentResult:
+        usage = state.usage
+        if state.record:
+            self.memory.add_exchange(state.prompt, output)
+            if self.compactor:
+                self.compactor.schedule(self.memory)
+
+        self.budget.record(
+            usage.tokens,
+            cache_read_tokens=usage.cache_read_tokens,
+            cache_write_tokens=usage.cache_write_tokens,
+        )
 
-        try:
-            if self._client:
-                request_params: dict[str, Any] = {
-                    "model": self.model,
-                    "max_tokens": config.MAX_TOKENS_PER_RUN,
-                    "system": system_prompt_with_context,
-                    "messages": messages,
-                }
-                if tools:
-                    request_params["tools"] = tools
-
-                response = self._client.messages.create(**request_params)
-                total_tokens += (
-                    response.usage.input_tokens + response.usage.output_tokens
-                )
+        metadata = self._timing_metadata(state.timing)
+        log_action(
+            session_id=self.session_id,
+            agent=self.name,
+            action_type="llm_call",
+            action=state.safe_task[:200],
+            approved=True,
+            result=output[:500],
+            tokens_used=usage.tokens,
+            cache_read_tokens=usage.cache_read_tokens,
+            cache_write_tokens=usage.cache_write_tokens,
+            model=self.model,
+            latency_ms=metadata["latency_ms"],
+        )
 
-                iteration = 0
-                while (
-                    response.stop_reason == "tool_use"
-                    and iteration < config.MAX_AGENT_TURNS
-                ):
-                    tool_results: list[dict[str, Any]] = []
-
-                    for block in response.content:
-                        if block.type != "tool_use":
-                            continue
-
-                        tool_name = block.name
-                        tool_input = cast(dict[str, Any], block.input)
-
-                        approved = True
-                        if requires_hitl(tool_name):
-                            approved = request_human_approval(
-                                session_id=self.session_id,
-                                agent=self.name,
-                                action_type=tool_name,
-                                action_description=f"Tool call: {tool_name}",
-                                details=str(tool_input),
-                            )
-
-                        if not approved:
-                            rejection = "Rejected by human approval gate."
-                            tool_results.append(
-                                {
-                                    "type": "tool_result",
-                                    "tool_use_id": block.id,
-                                    "content": rejection,
-                                    "is_error": True,
-                                }
-                            )
-                            log_action(
-                                session_id=self.session_id,
-                                agent=self.name,
-                                action_type="tool_call",
-                                action=tool_name,
-                                approved=False,
-                                result=rejection,
-                            )
-                            continue
-
-                        try:
-                            result = tool_call(
-                                tool_name,
-                                self.allowed_tools,
-                                **tool_input,
-                            )
-                            result_text = str(result)
-                            is_error = False
-                        except Exception as e:
-                            result_text = f"{type(e).__name__}: {e}"
-                            is_error = True
-
-                        tool_results.append(
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": block.id,
-                                "content": result_text,
-                                "is_error": is_error,
-                            }
-                        )
-                        log_action(
-                            session_id=self.session_id,
-                            agent=self.name,
-                            action_type="tool_call",
-                            action=tool_name,
-                            approved=not is_error,
-                            result=result_text[:500],
-                        )
+        return AgentResult(
+            success=True,
+            content=output,
+            tokens_used=usage.tokens,
+            metadata=metadata,
+        )
 
-                    messages.append({"role": "assistant", "content": response.content})
-                    messages.append({"role": "user", "content": tool_results})
+    def _run_api(
+        self,
+        client: anthropic.Anthropic,
+        state: RunState,
+        on_event: EventHandler | None,
+    ) -> str:
+        response, tool_batch = self._create_message(
+            client, self.request_params(state), on_event, state.timing
+        )
+        state.usage.add_response(response.usage)
 
-                    self.budget.check_run_budget()
+        iteration = 0
+        while response.stop_reason == "tool_use" and iteration < config.MAX_AGENT_TURNS:
+            outcomes = tool_batch.results()
+            self._append_tool_turn(state, response, outcomes, on_event)
 
-                    request_params = {
-                        "model": self.model,
-                        "max_tokens": config.MAX_TOKENS_PER_RUN,
-                        "system": system_prompt_with_context,
-                        "messages": messages,
-                    }
-                    if tools:
-                        request_params["tools"] = tools
+            response, tool_batch = self._create_message(
+                client, self.request_params(state), on_event, state.timing
+            )
+            state.usage.add_response(response.usage)
+            iteration += 1
+
+        return _final_text(response)
+
+    async def _arun_api(
+        self,
+        client: anthropic.AsyncAnthropic,
+        state: RunState,
+        on_event: EventHandler | None,
+    ) -> str:
+        response, tool_batch = await self._acreate_message(
+            client, self.request_params(state), on_event, state.timing
+        )
+        state.usage.add_response(response.usage)
 
-                    response = self._client.messages.create(**request_params)
-                    total_tokens += (
-                        response.usage.input_tokens + response.usage.output_tokens
-                    )
-                    iteration += 1
+        iteration = 0
+        while response.stop_reason == "tool_use" and iteration < config.MAX_AGENT_TURNS:
+            outcomes = await tool_batch.results()
+            self._append_tool_turn(state, response, outcomes, on_event)
 
-                text_blocks = [b for b in response.content if b.type == "text"]
-                if text_blocks:
-                    output = "\n".join(block.text for block in text_blocks)
-                elif response.stop_reason == "tool_use":
-                    output = "Stopped after reaching max tool-use turns."
+            response, tool_batch = await self._acreate_message(
+                client, self.request_params(state), on_event, state.timing
+            )
+            state.usage.add_response(response.usage)
+            iteration += 1
+
+        return _final_text(response)
+
+    def _append_tool_turn(
+        self,
+        state: RunState,
+        response: Any,
+        outcomes: list[ToolOutcome],
+        on_event: EventHandler | None,
+    ) -> None:
+        tool_blocks = [b for b in response.content if b.type == "tool_use"]
+        tool_results = [
+            self._tool_result(block, outcome, on_event)
+            for block, outcome in zip(tool_blocks, outcomes)
+        ]
+        state.messages.append({"role": "assistant", "content": response.content})
+        state.messages.append({"role": "user", "content": tool_results})
+        self.budget.check_run_budget()
 
-            elif self._session_client:
-                system_prompt = system_prompt_with_context
-                if tools:
-                    tool_lines = [
-                        f"- {tool['name']}: {tool['description']}" for tool in tools
-                    ]
-                    system_prompt = (
-                        f"{system_prompt}\n\n"
-                        "Available tools (descriptions only; no native tool execution in "
-                        "session mode):\n" + "\n".join(tool_lines)
-                    )
+    def _session_system_prompt(self, state: RunState) -> str:
+        if not state.tools:
+            return state.system_prompt
+        tool_lines = [f"- {tool['name']}: {tool['description']}" for tool in state.tools]
+        return (
+            f"{state.system_prompt}\n\n"
+            "Available tools (descriptions only; no native tool execution in "
+            "session mode):\n" + "\n".join(tool_lines)
+        )
 
-                output, tokens = self._session_client.send_message(
-                    prompt=prompt,
-                    model=self.model,
-                    max_tokens=config.MAX_TOKENS_PER_RUN,
-                    system=system_prompt,
-                )
-                total_tokens += tokens
-            else:
-                raise RuntimeError("No client configured")
+    def _text_handler(
+        self, on_event: EventHandler | None, timing: dict[str, float]
+    ) -> Callable[[str], None] | None:
+        if on_event is None:
+            return None
+        return lambda text: self._emit_text(on_event, timing, text)
+
+    def request_params(self, state: RunState) -> dict[str, Any]:
+        system_prompt, messages, tools = state.system_prompt, state.messages, state.tools
+        request_params: dict[str, Any] = {
+            "model": self.model,
+            "max_tokens": config.MAX_TOKENS_PER_RUN,
+            "system": system_prompt,
+            "messages": messages,
+        }
+        if tools:
+            request_params["tools"] = tools
+        if not config.PROMPT_CACHING:
+            return request_params
+
+        # Breakpoints (max 4): tools, system prompt, end of the stored history
+        # and the newest message, so each tool-loop iteration reads the prefix
+        # the previous one wrote.
+        cached_messages = list(messages)
+        breakpoints = {len(messages) - 1}
+        if 0 < state.history_len < len(messages):
+            breakpoints.add(state.history_len - 1)
+        for index in breakpoints:
+            cached_messages[index] = _with_cache_control(messages[index])
+
+        request_params["system"] = [
+            {"type": "text", "text": system_prompt, "cache_control": _EPHEMERAL}
+        ]
+        request_params["messages"] = cached_messages
+        if tools:
+            request_params["tools"] = [
+                *tools[:-1],
+                {**tools[-1], "cache_control": _EPHEMERAL},
+            ]
+        return request_params
+
+    def _create_message(
+        self,
+        client: anthropic.Anthropic,
+        request_params: dict[str, Any],
+        on_event: EventHandler | None,
+        timing: dict[str, float],
+    ) -> tuple[Any, ToolBatch[ToolOutcome]]:
+        tool_batch = ToolBatch(self._execute_tool)
+        if on_event is None:
+            response = client.messages.create(**request_params)
+            for block in response.content:
+                if block.type == "tool_use":
+                    tool_batch.add(block)
+            return response, tool_batch
+
+        with client.messages.stream(**request_params) as stream:
+            for event in stream:
+                if event.type == "text":
+                    self._emit_text(on_event, timing, event.text)
+                elif (
+                    event.type == "content_block_stop"
+                    and event.content_block.type == "tool_use"
+                ):
+                    block = event.content_block
+                    tool_input = cast(dict[str, Any], block.input)
+                    on_event(
+                        AgentEvent(
+                            type="tool_use", tool_name=block.name, tool_input=tool_input
+                        )
+                    )
+                    # Read-only tools start while the rest of the message is
+                    # still streaming in.
+                    tool_batch.add(block)
+            return stream.get_final_message(), tool_batch
+
+    async def _acreate_message(
+        self,
+        client: anthropic.AsyncAnthropic,
+        request_params: dict[str, Any],
+        on_event: EventHandler | None,
+        timing: dict[str, float],
+    ) -> tuple[Any, AsyncToolBatch[ToolOutcome]]:
+        tool_batch = AsyncToolBatch(self._aexecute_tool)
+        if on_event is None:
+            response = await client.messages.create(**request_params)
+            for block in response.content:
+                if block.type == "tool_use":
+                    tool_batch.add(block)
+            return response, tool_batch
+
+        async with client.messages.stream(**request_params) as stream:
+            async for event in stream:
+                if event.type == "text":
+                    self._emit_text(on_event, timing, event.text)
+                elif (
+                    event.type == "content_block_stop"
+                    and event.content_block.type == "tool_use"
+                ):
+                    block = event.content_block
+                    on_event(
+                        AgentEvent(
+                            type="tool_use",
+                            tool_name=block.name,
+                            tool_input=cast(dict[str, Any], block.input),
+                        )
+                    )
+                    tool_batch.add(block)
+            return await stream.get_final_message(), tool_batch
+
+    def _emit_text(
+        self, on_event: EventHandler, timing: dict[str, float], text: str
+    ) -> None:
+        timing.setdefault("first_token", time.perf_counter())
+        on_event(AgentEvent(type="text", text=text))
+
+    def _timing_metadata(self, timing: dict[str, float]) -> dict[str, Any]:
+        start = timing["start"]
+        metadata: dict[str, Any] = {
+            "latency_ms": round((time.perf_counter() - start) * 1000)
+        }
+        if "first_token" in timing:
+            metadata["ttft_ms"] = round((timing["first_token"] - start) * 1000)
+        return metadata
+
+    def _approve_tool(self, block: Any) -> bool:
+        return request_human_approval(
+            session_id=self.session_id,
+            agent=self.name,
+            action_type=block.name,
+            action_description=f"Tool call: {block.name}",
+            details=str(block.input),
+        )
 
-        except anthropic.APIError as e:
-            return AgentResult(success=False, content=f"API error: {e}")
-        except RuntimeError as e:
-            return AgentResult(success=False, content=f"Session error: {e}")
+    def _execute_tool(self, block: Any) -> ToolOutcome:
+        if requires_hitl(block.name) and not self._approve_tool(block):
+            return _REJECTED, True, False, 0
 
-        self.memory.add("user", prompt)
-        self.memory.add("assistant", output)
+        start = time.perf_counter()
+        try:
+            result = tool_call(
+                block.name, self.allowed_tools, **cast(dict[str, Any], block.input)
+            )
+            return str(result), False, True, _elapsed_ms(start)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}", True, True, _elapsed_ms(start)
 
-        self.budget.record(total_tokens)
+    async def _aexecute_tool(self, block: Any) -> ToolOutcome:
+        if requires_hitl(block.name):
+            if not await asyncio.to_thread(self._approve_tool, block):
+                return _REJECTED, True, False, 0
 
+        start = time.perf_counter()
+        try:
+            result = await tool_acall(
+                block.name, self.allowed_tools, **cast(dict[str, Any], block.input)
+            )
+            return str(result), False, True, _elapsed_ms(start)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}", True, True, _elapsed_ms(start)
+
+    def _tool_result(
+        self,
+        block: Any,
+        outcome: ToolOutcome,
+        on_event: EventHandler | None,
+    ) -> dict[str, Any]:
+        result_text, is_error, approved, latency_ms = outcome
         log_action(
             session_id=self.session_id,
             agent=self.name,
-            action_type="llm_call",
-            action=safe_task[:200],
-            approved=True,
-            result=output[:500],
-            tokens_used=total_tokens,
+            action_type="tool_call",
+            action=block.name,
+            approved=approved and not is_error,
+            result=result_text[:500],
+            latency_ms=latency_ms,
         )
-
-        return AgentResult(success=True, content=output, tokens_used=total_tokens)
+        if on_event is not None:
+            on_event(
+                AgentEvent(
+                    type="tool_result",
+                    text=result_text,
+                    tool_name=block.name,
+                    is_error=is_error,
+                )
+            )
+        return {
+            "type": "tool_result",
+            "tool_use_id": block.id,
+            "content": result_text,
+            "is_error": is_error,
+        }
 
     def _build_prompt(self, task: str, context: str) -> str:
         if context:
             return f"Context:\n{context}\n\nTask:\n{task}"
         return task
 
+    def _with_recall(self, task: str, prompt: str) -> str:
+        """Prefix ``prompt`` with matching notes from other sessions.
+
+        Goes in the final user turn rather than the system prompt, so the
+        cached system/tools prefix stays the same from turn to turn.
+        """
+        if self.long_term is None or not config.LTM_RESULTS:
+            return prompt
+        try:
+            notes = self.long_term.search(
+                task, limit=config.LTM_RESULTS, exclude_session=self.session_id
+            )
+        except sqlite3.Error:
+            return prompt
+        if not notes:
+            return prompt
+        lines = "\n".join(
+            f"- [{note.ts[:10]} {note.kind}] {note.content[:300]}" for note in notes
+        )
+        return f"Notes from earlier sessions (may be relevant):\n{lines}\n\n{prompt}"
+
     def _build_system_prompt_with_context(self) -> str:
         system_prompt = self.system_prompt
-        summary = self.memory.working_set.get("summary", "")
+        # Compaction swaps in a new dict; read one consistent version.
+        working_set = self.memory.working_set
+        summary = working_set.get("summary", "")
         if not summary:
             return system_prompt
 
-        facts = self.memory.working_set.get("pinned_facts", [])[:10]
-        decisions = self.memory.working_set.get("decisions", [])[:10]
+        facts = working_set.get("pinned_facts", [])[:10]
+        decisions = working_set.get("decisions", [])[:10]
         facts_lines = "\n".join(f"- {fact}" for fact in facts)
         decision_lines = "\n".join(f"- {decision}" for decision in decisions)
 
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TextIO
+
+from rich.console import Console
+
+from ..core.budget import BudgetExceededError, BudgetTracker
+from ..core.memory import SessionMemory
+from .base import AgentResult, BaseAgent
+from .commander import CommanderAgent
+from .message_batches import MessageBatchRunner
+
+console = Console()
+
+ArmyFactory = Callable[[str, BudgetTracker, SessionMemory], CommanderAgent]
+
+
+@dataclass
+class BatchTask:
+    id: str
+    task: str
+    plan: bool = False
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+def read_tasks(path: Path) -> Iterator[BatchTask]:
+    """Stream tasks from a JSONL file without loading it into memory.
+
+    Each line is either ``{"id": ..., "task": ..., "plan": false}`` or a bare
+    JSON string. Lines without an id are numbered by position.
+    """
+    with path.open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON ({e})") from e
+            if isinstance(item, str):
+                item = {"task": item}
+            if not isinstance(item, dict) or not item.get("task"):
+                raise ValueError(f'{path}:{line_no}: expected a "task" field')
+            yield BatchTask(
+                id=str(item.get("id", line_no)),
+                task=str(item["task"]),
+                plan=bool(item.get("plan", False)),
+            )
+
+
+class BatchRunner:
+    """Runs many independent tasks through ``CommanderAgent.adispatch``.
+
+    At most ``concurrency`` tasks are in flight; each gets its own memory and a
+    per-task budget that rolls up into ``budget``. Results are written as JSONL
+    in completion order, so a partially finished batch keeps what it produced.
+    """
+
+    def __init__(
+        self,
+        build: ArmyFactory,
+        budget: BudgetTracker,
+        concurrency: int = 4,
+        task_token_limit: int | None = None,
+    ):
+        self.build = build
+        self.budget = budget
+        self.concurrency = max(1, concurrency)
+        self.task_token_limit = task_token_limit
+
+    async def run(self, tasks: Iterator[BatchTask], output: TextIO) -> BatchSummary:
+        summary = BatchSummary()
+        slots = asyncio.Semaphore(self.concurrency)
+        pending: set[asyncio.Task[None]] = set()
+
+        def write(record: dict[str, Any]) -> None:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+        async def worker(item: BatchTask) -> None:
+            try:
+                record = await self._run_one(item)
+            finally:
+                slots.release()
+            if record.get("skipped"):
+                summary.skipped += 1
+            elif record["success"]:
+                summary.succeeded += 1
+            else:
+                summary.failed += 1
+            status = "[green]✓[/green]" if record["success"] else "[red]✗[/red]"
+            console.print(
+                f"[dim]{status} {item.id} ({record['tokens_used']:,} tokens)[/dim]"
+            )
+            write(record)
+
+        for item in tasks:
+            summary.total += 1
+            if self.budget.remaining() <= 0:
+                summary.skipped += 1
+                write(self._skipped(item))
+                continue
+            await slots.acquire()
+            job = asyncio.create_task(worker(item))
+            pending.add(job)
+            job.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+        return summary
+
+    async def run_batched(
+        self,
+        tasks: Iterator[BatchTask],
+        output: TextIO,
+        batches: MessageBatchRunner,
+    ) -> BatchSummary:
+        """Route every task, then answer them all through the Message Batches API.
+
+        Routing still runs ``concurrency`` at a time; plan tasks are routed like
+        any other since plans need their step results before synthesis.
+        """
+        summary = BatchSummary()
+        slots = asyncio.Semaphore(self.concurrency)
+        items = list(tasks)
+        summary.total = len(items)
+        # Keyed by position: ids come from the input and may repeat.
+        budgets: dict[int, BudgetTracker] = {}
+        results: dict[int, AgentResult] = {}
+
+        async def route(index: int, item: BatchTask) -> tuple[int, BaseAgent, str] | None:
+            session_id = f"batch-{item.id}"
+            budget = BudgetTracker(
+                session_id=session_id, limit=self.task_token_limit, parent=self.budget
+            )
+            budgets[index] = budget
+            try:
+                army = self.build(
+                    session_id, budget, SessionMemory(session_id=session_id)
+                )
+                async with slots:
+                    agent_name, task, _ = await army.aroute(item.task)
+            except Exception as e:
+                # A failed routing call fails this task only.
+                results[index] = AgentResult(
+                    success=False, content=f"{type(e).__name__}: {e}"
+                )
+                return None
+            return index, army.get_agent(agent_name) or army, task
+
+        routed = await asyncio.gather(
+            *(route(index, item) for index, item in enumerate(items))
+        )
+        jobs = [job for job in routed if job is not None]
+        if jobs:
+            results.update(await asyncio.to_thread(batches.run, jobs))
+
+        for index, item in enumerate(items):
+            record = self._record(item, results[index], budgets[index])
+            if record["success"]:
+                summary.succeeded += 1
+            else:
+                summary.failed += 1
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+        return summary
+
+    async def _run_one(self, item: BatchTask) -> dict[str, Any]:
+        session_id = f"batch-{item.id}"
+        budget = BudgetTracker(
+            session_id=session_id, limit=self.task_token_limit, parent=self.budget
+        )
+        if self.budget.remaining() <= 0:
+            return self._skipped(item)
+
+        try:
+            army = self.build(session_id, budget, SessionMemory(session_id=session_id))
+            result = await army.adispatch(item.task, plan=item.plan)
+        except BudgetExceededError as e:
+            result = AgentResult(success=False, content=str(e))
+        except Exception as e:
+            # API/session errors fail this task only; the batch keeps going.
+            result = AgentResult(success=False, content=f"{type(e).__name__}: {e}")
+        return self._record(item, result, budget)
+
+    @staticmethod
+    def _record(
+        item: BatchTask, result: AgentResult, budget: BudgetTracker
+    ) -> dict[str, Any]:
+        record: dict[str, Any] = {
+            "id": item.id,
+            "success": result.success,
+            "content": result.content,
+            "tokens_used": budget.tokens_used,
+        }
+        if "latency_ms" in result.metadata:
+            record["latency_ms"] = result.metadata["latency_ms"]
+        return record
+
+    @staticmethod
+    def _skipped(item: BatchTask) -> dict[str, Any]:
+        return {
+            "id": item.id,
+            "success": False,
+            "content": "Skipped: batch token budget exhausted.",
+            "tokens_used": 0,
+            "skipped": True,
+        }
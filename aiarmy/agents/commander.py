@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import re
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 
 from rich.console import Console
 
 from ..core.config import config
 from ..core.memory import SessionMemory
 from ..core.budget import BudgetTracker
-from .base import BaseAgent, AgentResult
+from ..core.cache import PersistentLRUCache
+from ..core.audit import log_action
+from ..core.clients import ClientProvider
+from ..core.long_term_memory import LongTermMemory
+from .base import BaseAgent, AgentResult, EventHandler
+from .router import LocalRouter, get_local_router
 
 console = Console()
 
@@ -18,7 +29,8 @@ Your team:
 - researcher: web research, document analysis, fact-finding, summarization
 - writer: blog posts, documentation, emails, creative content
 - analyst: data analysis, charts, metrics, business insights
-- commander: coordination, planning, anything that needs multiple agents
+- commander: coordination, general questions, anything that fits no specialist
+- plan: compound requests that need several specialists (e.g. research, then write)
 
 Given a user request, respond ONLY with valid JSON:
 {
@@ -28,11 +40,35 @@ Given a user request, respond ONLY with valid JSON:
 }
 
 Rules:
-- If the task needs multiple agents, pick the most important one first
+- If the task needs multiple specialists, pick "plan"; the Commander will split it
 - Be specific in the task description — the agent sees ONLY what you write here
 - Never pick an agent for a task they aren't suited for
 """
 
+PLANNING_SYSTEM = """You are the Commander — the orchestrator of an AI team.
+
+Your team:
+- developer: writing code, reviewing PRs, debugging, git operations
+- researcher: web research, document analysis, fact-finding, summarization
+- writer: blog posts, documentation, emails, creative content
+- analyst: data analysis, charts, metrics, business insights
+
+Split the user request into a small dependency graph of specialist tasks.
+Respond ONLY with valid JSON:
+{
+  "tasks": [
+    {"id": "t1", "agent": "<agent_name>", "task": "<self-contained task>", "depends_on": []},
+    {"id": "t2", "agent": "<agent_name>", "task": "<self-contained task>", "depends_on": ["t1"]}
+  ]
+}
+
+Rules:
+- Use as few tasks as possible; independent tasks must not depend on each other
+- A task only lists a dependency when it needs that task's output
+- Each task description must be self-contained — the agent sees ONLY what you write
+  plus the outputs of its dependencies
+"""
+
 COMMANDER_SYSTEM = """You are the Commander of an elite AI team working for your user.
 
 Your responsibilities:
@@ -47,62 +83,404 @@ The AIarmy is built on two core principles:
 """
 
 
+@dataclass
+class PlanStep:
+    id: str
+    agent: str
+    task: str
+    depends_on: list[str] = field(default_factory=list)
+
+
+def _is_valid_plan(steps: list[PlanStep]) -> bool:
+    if not steps or len(steps) > config.PLAN_MAX_STEPS:
+        return False
+    ids = {step.id for step in steps}
+    if len(ids) != len(steps):
+        return False
+    if any(dep not in ids or dep == step.id for step in steps for dep in step.depends_on):
+        return False
+
+    resolved: set[str] = set()
+    remaining = list(steps)
+    while remaining:
+        ready = [s for s in remaining if all(d in resolved for d in s.depends_on)]
+        if not ready:
+            return False
+        resolved.update(s.id for s in ready)
+        remaining = [s for s in remaining if s.id not in resolved]
+    return True
+
+
+def _routing_key(user_input: str) -> str:
+    normalized = " ".join(re.sub(r"[^\w\s]", " ", user_input.lower()).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
 class CommanderAgent(BaseAgent):
     name = "commander"
     role = "Orchestrator & CEO"
     model = config.COMMANDER_MODEL
     system_prompt = COMMANDER_SYSTEM
 
-    def __init__(self, session_id: str, budget: BudgetTracker, memory: SessionMemory):
-        super().__init__(session_id, budget, memory)
+    def __init__(
+        self,
+        session_id: str,
+        budget: BudgetTracker,
+        memory: SessionMemory,
+        clients: ClientProvider | None = None,
+        routing_cache: PersistentLRUCache | None = None,
+        long_term: LongTermMemory | None = None,
+    ):
+        super().__init__(session_id, budget, memory, clients, long_term)
+        self.routing_cache = routing_cache
         self._roster: dict[str, BaseAgent] = {}
+        self._factories: dict[str, Callable[[], BaseAgent]] = {}
+        self.router: LocalRouter | None = (
+            get_local_router() if config.LOCAL_ROUTER else None
+        )
 
     def register(self, agent: BaseAgent) -> None:
         self._roster[agent.name] = agent
 
+    def register_factory(self, name: str, factory: Callable[[], BaseAgent]) -> None:
+        self._factories[name] = factory
+
+    def get_agent(self, name: str) -> BaseAgent | None:
+        agent = self._roster.get(name)
+        if agent is None and name in self._factories:
+            agent = self._factories.pop(name)()
+            self._roster[name] = agent
+        return agent
+
     def route(self, user_input: str) -> tuple[str, str, str]:
+        shortcut = self._route_without_model(user_input)
+        if shortcut is not None:
+            return shortcut
+        completion = self._complete(
+            ROUTING_SYSTEM, user_input, config.SPECIALIST_MODEL, max_tokens=300
+        )
+        return self._route_from_completion(
+            user_input, completion, config.SPECIALIST_MODEL
+        )
+
+    async def aroute(self, user_input: str) -> tuple[str, str, str]:
+        shortcut = self._route_without_model(user_input)
+        if shortcut is not None:
+            return shortcut
+        completion = await self._acomplete(
+            ROUTING_SYSTEM, user_input, config.SPECIALIST_MODEL, max_tokens=300
+        )
+        return self._route_from_completion(
+            user_input, completion, config.SPECIALIST_MODEL
+        )
+
+    def _route_without_model(self, user_input: str) -> tuple[str, str, str] | None:
+        if self.routing_cache is not None:
+            cached = self.routing_cache.get(_routing_key(user_input))
+            log_action(
+                session_id=self.session_id,
+                agent=self.name,
+                action_type="route_cache",
+                action=user_input[:200],
+                approved=True,
+                result=(
+                    f"hit: saved {cached['tokens']} tokens" if cached else "miss"
+                ),
+            )
+            if cached:
+                # The key is normalized, so the cached rewrite may come from a
+                # differently worded request; always pass on this input.
+                return cached["agent"], user_input, f"{cached['reason']} (cached)"
+
+        if self.router is not None:
+            local = self.router.route(user_input)
+            if local is not None:
+                agent_name, confidence = local
+                reason = f"local router ({confidence:.0%} confident)"
+                self._log_route(user_input, agent_name, user_input, reason, "local")
+                return agent_name, user_input, reason
+
+        return None
+
+    def _route_from_completion(
+        self, user_input: str, completion: tuple[str, int] | None, model: str
+    ) -> tuple[str, str, str]:
+        if completion is None:
+            return "commander", user_input, "fallback: no client configured"
+        raw, tokens = completion
+
+        try:
+            data = json.loads(raw)
+            agent_name, task, reason = data["agent"], data["task"], data["reason"]
+        except (json.JSONDecodeError, KeyError):
+            return "commander", user_input, "fallback: could not parse routing"
+
+        self._log_route(user_input, agent_name, task, reason, "llm", tokens, model)
+        if self.routing_cache is not None:
+            self.routing_cache.set(
+                _routing_key(user_input),
+                {"agent": agent_name, "reason": reason, "tokens": tokens},
+            )
+        if self.router is not None:
+            self.router.learn(user_input, agent_name)
+        return agent_name, task, reason
+
+    def _complete(
+        self, system: str, user_input: str, model: str, max_tokens: int
+    ) -> tuple[str, int] | None:
         if self._client:
             resp = self._client.messages.create(
-                model=config.SPECIALIST_MODEL,
-                max_tokens=300,
-                system=ROUTING_SYSTEM,
+                model=model,
+                max_tokens=max_tokens,
+                system=system,
                 messages=[{"role": "user", "content": user_input}],
             )
             tokens = resp.usage.input_tokens + resp.usage.output_tokens
             self.budget.record(tokens)
 
             text_blocks = [b for b in resp.content if b.type == "text"]
-            raw = text_blocks[0].text.strip() if text_blocks else "{}"
+            return (text_blocks[0].text.strip() if text_blocks else "{}"), tokens
 
-        elif self._session_client:
+        if self._session_client:
             raw, tokens = self._session_client.send_message(
                 prompt=user_input,
-                model=config.SPECIALIST_MODEL,
-                max_tokens=300,
-                system=ROUTING_SYSTEM,
+                model=model,
+                max_tokens=max_tokens,
+                system=system,
             )
             self.budget.record(tokens)
-            raw = raw.strip()
+            return raw.strip(), tokens
 
-        else:
-            return "commander", user_input, "fallback: no client configured"
+        return None
 
-        try:
-            data = json.loads(raw)
-            return data["agent"], data["task"], data["reason"]
-        except (json.JSONDecodeError, KeyError):
-            return "commander", user_input, "fallback: could not parse routing"
+    async def _acomplete(
+        self, system: str, user_input: str, model: str, max_tokens: int
+    ) -> tuple[str, int] | None:
+        if self._client:
+            resp = await self.clients.async_anthropic().messages.create(
+                model=model,
+                max_tokens=max_tokens,
+                system=system,
+                messages=[{"role": "user", "content": user_input}],
+            )
+            tokens = resp.usage.input_tokens + resp.usage.output_tokens
+            self.budget.record(tokens)
+
+            text_blocks = [b for b in resp.content if b.type == "text"]
+            return (text_blocks[0].text.strip() if text_blocks else "{}"), tokens
 
-    def dispatch(self, user_input: str) -> AgentResult:
-        if self.compactor and self.compactor.should_compact(self.memory):
-            self.compactor.compact(self.memory)
+        if self._session_client:
+            raw, tokens = await self._session_client.asend_message(
+                prompt=user_input,
+                model=model,
+                max_tokens=max_tokens,
+                system=system,
+            )
+            self.budget.record(tokens)
+            return raw.strip(), tokens
+
+        return None
+
+    def _log_route(
+        self,
+        user_input: str,
+        agent_name: str,
+        task: str,
+        reason: str,
+        source: str,
+        tokens: int = 0,
+        model: str | None = None,
+    ) -> None:
+        log_action(
+            session_id=self.session_id,
+            agent=self.name,
+            action_type="route",
+            action=user_input[:200],
+            approved=True,
+            result=json.dumps(
+                {"agent": agent_name, "task": task[:200], "reason": reason, "source": source}
+            ),
+            tokens_used=tokens,
+            model=model,
+        )
+
+    def dispatch(
+        self,
+        user_input: str,
+        on_event: EventHandler | None = None,
+        plan: bool = False,
+    ) -> AgentResult:
+        if plan:
+            return self.dispatch_plan(user_input, on_event=on_event)
 
         agent_name, task, reason = self.route(user_input)
 
+        if agent_name == "plan":
+            console.print(f"\n[dim]→ Planning: {reason}[/dim]")
+            return self.dispatch_plan(user_input, on_event=on_event)
+
         console.print(f"\n[dim]→ Routing to [bold]{agent_name}[/bold]: {reason}[/dim]")
 
-        target = self._roster.get(agent_name, self)
-        return target.run(task)
+        target = self.get_agent(agent_name) or self
+        return target.run(task, on_event=on_event)
+
+    async def adispatch(
+        self,
+        user_input: str,
+        on_event: EventHandler | None = None,
+        plan: bool = False,
+    ) -> AgentResult:
+        # Plans already fan out over their own worker threads.
+        if plan:
+            return await asyncio.to_thread(self.dispatch_plan, user_input, on_event)
+
+        agent_name, task, reason = await self.aroute(user_input)
+
+        if agent_name == "plan":
+            console.print(f"\n[dim]→ Planning: {reason}[/dim]")
+            return await asyncio.to_thread(self.dispatch_plan, user_input, on_event)
+
+        console.print(f"\n[dim]→ Routing to [bold]{agent_name}[/bold]: {reason}[/dim]")
+
+        target = self.get_agent(agent_name) or self
+        return await target.arun(task, on_event=on_event)
+
+    def plan(self, user_input: str) -> list[PlanStep]:
+        completion = self._complete(
+            PLANNING_SYSTEM, user_input, config.COMMANDER_MODEL, max_tokens=1000
+        )
+        if completion is None:
+            return []
+        raw, tokens = completion
+
+        try:
+            data = json.loads(raw)
+            steps = [
+                PlanStep(
+                    id=str(item["id"]),
+                    agent=str(item["agent"]),
+                    task=str(item["task"]),
+                    depends_on=[str(dep) for dep in item.get("depends_on", [])],
+                )
+                for item in data["tasks"]
+            ]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            steps = []
+
+        if not _is_valid_plan(steps):
+            steps = []
+
+        log_action(
+            session_id=self.session_id,
+            agent=self.name,
+            action_type="plan",
+            action=user_input[:200],
+            approved=bool(steps),
+            result=json.dumps([step.__dict__ for step in steps])[:500]
+            if steps
+            else "fallback: could not parse plan",
+            tokens_used=tokens,
+            model=config.COMMANDER_MODEL,
+        )
+        return steps
+
+    def dispatch_plan(
+        self, user_input: str, on_event: EventHandler | None = None
+    ) -> AgentResult:
+        steps = self.plan(user_input)
+        if not steps:
+            return self.run(user_input, on_event=on_event)
+
+        # Steps and the synthesis run unrecorded; the session only keeps the
+        # user's request and the final answer.
+        if len(steps) == 1:
+            step = steps[0]
+            console.print(f"\n[dim]→ Routing to [bold]{step.agent}[/bold][/dim]")
+            result = (self.get_agent(step.agent) or self).run(
+                step.task, on_event=on_event, record=False
+            )
+            self._remember(user_input, result)
+            return result
+
+        agents = {step.id: self.get_agent(step.agent) or self for step in steps}
+        results = self._execute_plan(steps, agents)
+
+        context = "\n\n".join(
+            f"## {step.id} ({step.agent}): {step.task}\n{results[step.id].content}"
+            for step in steps
+        )
+        final = self.run(
+            "Synthesize the specialist results below into one coherent answer to "
+            f"the original request.\n\nOriginal request:\n{user_input}",
+            context=context,
+            on_event=on_event,
+            record=False,
+        )
+        self._remember(user_input, final)
+        final.tokens_used += sum(result.tokens_used for result in results.values())
+        final.metadata["plan"] = [
+            {"id": step.id, "agent": step.agent, "success": results[step.id].success}
+            for step in steps
+        ]
+        return final
+
+    def _remember(self, user_input: str, result: AgentResult) -> None:
+        if not result.success:
+            return
+        self.memory.add_exchange(user_input, result.content)
+        if self.compactor:
+            self.compactor.schedule(self.memory)
+
+    def _execute_plan(
+        self, steps: list[PlanStep], agents: dict[str, BaseAgent]
+    ) -> dict[str, AgentResult]:
+        # A claude.ai conversation cannot take concurrent messages.
+        workers = config.PLAN_MAX_CONCURRENCY if self._client else 1
+        results: dict[str, AgentResult] = {}
+        pending = {step.id: step for step in steps}
+        running: dict[Future[AgentResult], PlanStep] = {}
+
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="aiarmy-plan"
+        ) as pool:
+            while pending or running:
+                for step in list(pending.values()):
+                    if not all(dep in results for dep in step.depends_on):
+                        continue
+                    del pending[step.id]
+                    failed = [d for d in step.depends_on if not results[d].success]
+                    if failed:
+                        results[step.id] = AgentResult(
+                            success=False,
+                            content=f"Skipped: upstream task(s) {', '.join(failed)} failed.",
+                        )
+                        continue
+                    console.print(
+                        f"[dim]→ {step.id}: [bold]{step.agent}[/bold] — {step.task[:80]}[/dim]"
+                    )
+                    upstream = "\n\n".join(
+                        f"## {dep}\n{results[dep].content}" for dep in step.depends_on
+                    )
+                    future = pool.submit(
+                        agents[step.id].run, step.task, upstream, record=False
+                    )
+                    running[future] = step
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    try:
+                        results[step.id] = future.result()
+                    except Exception as e:
+                        results[step.id] = AgentResult(
+                            success=False, content=f"{type(e).__name__}: {e}"
+                        )
+                    status = "✓" if results[step.id].success else "✗"
+                    console.print(f"[dim]  {status} {step.id} ({step.agent})[/dim]")
+
+        return results
 
     def describe(self) -> str:
         return "Orchestrates the AI team, routes tasks to the right specialist."
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Hashable
+from dataclasses import dataclass
+
+import anthropic
+from rich.console import Console
+
+from ..core.audit import log_action
+from ..core.budget import BudgetExceededError
+from ..core.config import config
+from .base import AgentResult, BaseAgent, RunState
+
+console = Console()
+
+
+@dataclass
+class _Request:
+    key: Hashable
+    agent: BaseAgent
+    state: RunState
+    turns: int = 0
+
+
+class MessageBatchRunner:
+    """Runs agent tasks through the Message Batches API instead of one
+    ``messages.create`` call each.
+
+    All pending requests are submitted as one batch, polled until it ends and
+    mapped back onto the agents that issued them. Requests that stop for tool
+    use run their tools locally and go into the next round's batch.
+    """
+
+    def __init__(
+        self,
+        client: anthropic.Anthropic,
+        session_id: str,
+        poll_interval: float | None = None,
+    ):
+        self.client = client
+        self.session_id = session_id
+        self.poll_interval = (
+            poll_interval if poll_interval is not None else config.BATCH_POLL_INTERVAL
+        )
+
+    def run(
+        self, jobs: list[tuple[Hashable, BaseAgent, str]]
+    ) -> dict[Hashable, AgentResult]:
+        """Run ``(key, agent, task)`` jobs; returns results keyed by ``key``."""
+        results: dict[Hashable, AgentResult] = {}
+        pending: list[_Request] = []
+        for key, agent, task in jobs:
+            try:
+                state = agent.prepare_request(task)
+            except BudgetExceededError as e:
+                results[key] = AgentResult(success=False, content=str(e))
+                continue
+            if isinstance(state, AgentResult):
+                results[key] = state
+                continue
+            pending.append(_Request(key=key, agent=agent, state=state))
+
+        round_no = 0
+        while pending:
+            round_no += 1
+            try:
+                pending = self._run_round(pending, results, round_no)
+            except anthropic.APIError as e:
+                for request in pending:
+                    results[request.key] = AgentResult(
+                        success=False, content=f"API error: {e}"
+                    )
+                break
+        return results
+
+    def _run_round(
+        self,
+        pending: list[_Request],
+        results: dict[Hashable, AgentResult],
+        round_no: int,
+    ) -> list[_Request]:
+        # custom_id must be short and alphanumeric; task keys may be neither.
+        by_id = {f"req-{i}": request for i, request in enumerate(pending)}
+        batch = self.client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": custom_id,
+                    "params": request.agent.request_params(request.state),
+                }
+                for custom_id, request in by_id.items()
+            ]
+        )
+        log_action(
+            session_id=self.session_id,
+            agent="batch",
+            action_type="message_batch",
+            action=batch.id,
+            approved=True,
+            result=f"round {round_no}: {len(by_id)} requests submitted",
+        )
+
+        with console.status(
+            f"[dim]Batch {batch.id} (round {round_no}, {len(by_id)} requests)...[/dim]"
+        ):
+            while batch.processing_status != "ended":
+                time.sleep(self.poll_interval)
+                batch = self.client.messages.batches.retrieve(batch.id)
+
+        next_round: list[_Request] = []
+        for entry in self.client.messages.batches.results(batch.id):
+            request = by_id.pop(entry.custom_id, None)
+            if request is None:
+                continue
+            outcome = entry.result
+            if outcome.type != "succeeded":
+                error = getattr(getattr(outcome, "error", None), "error", None)
+                detail = getattr(error, "message", "") or outcome.type
+                results[request.key] = AgentResult(
+                    success=False, content=f"Batch request {outcome.type}: {detail}"
+                )
+                continue
+
+            response = outcome.message
+            request.state.usage.add_response(response.usage)
+            if (
+                response.stop_reason == "tool_use"
+                and request.turns < config.MAX_AGENT_TURNS
+            ):
+                try:
+                    request.agent.continue_tool_turn(request.state, response)
+                except BudgetExceededError as e:
+                    results[request.key] = AgentResult(success=False, content=str(e))
+                    continue
+                request.turns += 1
+                next_round.append(request)
+                continue
+
+            results[request.key] = request.agent.finish_request(
+                request.state, response
+            )
+
+        for request in by_id.values():
+            results[request.key] = AgentResult(
+                success=False, content="Batch request returned no result."
+            )
+        return next_round
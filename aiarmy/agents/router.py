@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import Counter
+
+from ..core.audit import get_routing_history
+from ..core.config import config
+
+SEED_EXAMPLES: dict[str, list[str]] = {
+    "developer": [
+        "write a python function",
+        "fix this bug in the code",
+        "debug the stack trace and exception",
+        "review this pull request",
+        "refactor the module and add type hints",
+        "run the tests and fix failing tests",
+        "commit the changes and push to git",
+        "git status diff log branch merge",
+        "install the npm package dependency",
+        "implement an api endpoint in typescript",
+        "write a unit test for the class",
+        "why does this script crash with a traceback",
+        "compile the project and fix the build error",
+        "clone the repository and set up the code",
+    ],
+    "researcher": [
+        "research the latest news about",
+        "find information and sources on",
+        "search the web for papers about",
+        "summarize this document and article",
+        "what is the history of",
+        "compare the options and find facts",
+        "look up the documentation for",
+        "fact check this claim with sources",
+        "read this paper and extract key points",
+        "who invented and when was it released",
+        "gather references and citations about",
+    ],
+    "writer": [
+        "write a blog post about",
+        "draft an email to the team",
+        "write documentation and a readme",
+        "edit and proofread this text",
+        "write a proposal and cover letter",
+        "rewrite this paragraph to sound better",
+        "create a newsletter announcement",
+        "write a story poem or creative content",
+        "draft release notes and a changelog",
+        "improve the tone and wording of this message",
+    ],
+    "analyst": [
+        "analyze the data and metrics",
+        "calculate roi and unit economics",
+        "build a swot analysis",
+        "analyze the sales numbers and trends",
+        "compute kpis from this csv",
+        "market sizing and competitive analysis",
+        "forecast revenue and growth scenarios",
+        "cohort and funnel analysis of users",
+        "what insights do these statistics show",
+        "evaluate the business model and pricing",
+    ],
+    "commander": [
+        "plan a project with multiple steps across the team",
+        "coordinate the team on this multi part task",
+        "research then write then analyze",
+        "break this goal into tasks for each agent",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9_+#]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class LocalRouter:
+    """Multinomial naive Bayes over seed phrases and past LLM routing decisions.
+
+    Inputs classified above ``threshold`` are routed without a network call;
+    everything else falls back to the LLM router.
+    """
+
+    def __init__(self, threshold: float | None = None):
+        self.threshold = (
+            threshold if threshold is not None else config.ROUTER_CONFIDENCE_THRESHOLD
+        )
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._doc_counts: Counter[str] = Counter()
+        self._term_counts: dict[str, Counter[str]] = {}
+        self._term_totals: Counter[str] = Counter()
+        self._vocab: set[str] = set()
+
+        for label, examples in SEED_EXAMPLES.items():
+            for example in examples:
+                self.learn(example, label)
+
+    def learn(self, text: str, label: str) -> None:
+        tokens = tokenize(text)
+        if not tokens:
+            return
+        with self._lock:
+            self._doc_counts[label] += 1
+            self._term_counts.setdefault(label, Counter()).update(tokens)
+            self._term_totals[label] += len(tokens)
+            self._vocab.update(tokens)
+
+    def load_history(self, limit: int = 5000) -> int:
+        history = get_routing_history(limit=limit)
+        for text, label in history:
+            self.learn(text, label)
+        return len(history)
+
+    def classify(self, text: str) -> tuple[str, float]:
+        with self._lock:
+            tokens = [t for t in tokenize(text) if t in self._vocab]
+            if not tokens:
+                return "commander", 0.0
+
+            total_docs = sum(self._doc_counts.values())
+            vocab_size = len(self._vocab)
+            scores: dict[str, float] = {}
+            for label, doc_count in self._doc_counts.items():
+                counts = self._term_counts[label]
+                denominator = self._term_totals[label] + vocab_size
+                score = math.log(doc_count / total_docs)
+                for token in tokens:
+                    score += math.log((counts[token] + 1) / denominator)
+                scores[label] = score
+
+        best = max(scores, key=lambda label: scores[label])
+        norm = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / norm
+
+    def route(self, text: str) -> tuple[str, float] | None:
+        label, confidence = self.classify(text)
+        with self._lock:
+            if confidence >= self.threshold:
+                self.hits += 1
+                return label, confidence
+            self.misses += 1
+            return None
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        return (
+            f"{self.hits}/{total} routed locally ({self.hit_rate() * 100:.1f}%), "
+            f"threshold {self.threshold:.2f}"
+        )
+
+
+_router: LocalRouter | None = None
+_router_lock = threading.Lock()
+
+
+def get_local_router() -> LocalRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LocalRouter()
+            _router.load_history()
+        return _router
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import re
+import sqlite3
 import sys
 import uuid
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from pathlib import Path
 
 import click
 from rich.console import Console
+from rich.markup import escape
+from rich.live import Live
 from rich.panel import Panel
 from rich.table import Table
 from rich.markdown import Markdown
@@ -14,8 +21,17 @@ from rich.prompt import Prompt
 from .core.config import config
 from .core.memory import SessionMemory
 from .core.budget import BudgetTracker
-from .core.audit import get_session_logs
+from .core.audit import get_session_logs, iter_logs
+from .core.audit_archive import export_jsonl, rotate, rotate_if_due
+from .core.cache import PersistentLRUCache
+from .core.clients import ClientProvider
+from .core.long_term_memory import LongTermMemory
+from .core.security import set_interactive
 from .core.session_manager import SessionManager
+from .core.stats import DIMENSIONS, top_tasks, usage_by
+from .agents.base import AgentEvent, AgentResult
+from .agents.batch import BatchRunner, read_tasks
+from .agents.message_batches import MessageBatchRunner
 from .agents.commander import CommanderAgent
 from .agents.developer import DeveloperAgent
 from .agents.researcher import ResearcherAgent
@@ -40,8 +56,10 @@ HELP_TEXT = """
 [bold]Commands:[/bold]
   [cyan]help[/cyan]        Show this message
   [cyan]team[/cyan]        Show your AI team
-  [cyan]budget[/cyan]      Show token usage this session
+  [cyan]budget[/cyan]      Show token usage this session and summary cache hits
+  [cyan]router[/cyan]      Show how many routing calls were answered locally or from cache
   [cyan]log[/cyan]         Show audit log for this session
+  [cyan]plan[/cyan] <task> Split a task across several specialists running in parallel
   [cyan]clear[/cyan]       Clear conversation history
   [cyan]exit[/cyan]        Quit
 
@@ -49,13 +67,116 @@ HELP_TEXT = """
 """
 
 
+class _StreamRenderer:
+    def __init__(self, panel: bool = True) -> None:
+        self.panel = panel
+        self.streamed = False
+        self._text = ""
+        self._live: Live | None = None
+        self._status = console.status("[bold cyan]Working...[/bold cyan]")
+
+    def __enter__(self) -> _StreamRenderer:
+        self._status.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop_live()
+        self._status.stop()
+
+    def __call__(self, event: AgentEvent) -> None:
+        if event.type == "text":
+            if self._live is None:
+                self._status.stop()
+                self._text = ""
+                self._live = Live(
+                    console=console,
+                    refresh_per_second=12,
+                    vertical_overflow="visible",
+                )
+                self._live.start()
+            self._text += event.text
+            self._live.update(self._renderable())
+            self.streamed = True
+        elif event.type == "tool_use":
+            self._stop_live()
+            console.print(f"[dim]🔧 {event.tool_name}[/dim]")
+            self._status.start()
+        elif event.type == "tool_result" and event.is_error:
+            console.print(f"[dim red]   {event.tool_name} failed[/dim red]")
+
+    def _renderable(self) -> Markdown | Panel:
+        if not self.panel:
+            return Markdown(self._text)
+        return Panel(Markdown(self._text), border_style="cyan", padding=(1, 2))
+
+    def _stop_live(self) -> None:
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+
+
+def _dispatch(
+    army: CommanderAgent, task: str, panel: bool = True, plan: bool = False
+) -> AgentResult:
+    if not config.STREAM_RESPONSES:
+        with console.status("[bold cyan]Working...[/bold cyan]"):
+            result = army.dispatch(task, plan=plan)
+    else:
+        with _StreamRenderer(panel=panel) as renderer:
+            result = army.dispatch(task, on_event=renderer, plan=plan)
+        if renderer.streamed and result.success:
+            return result
+
+    if result.success:
+        content = Markdown(result.content)
+        console.print(
+            Panel(content, border_style="cyan", padding=(1, 2)) if panel else content
+        )
+    elif panel:
+        console.print(f"[red]{result.content}[/red]")
+    else:
+        console.print(f"[red]Failed: {result.content}[/red]")
+    return result
+
+
+def _latency_summary(result: AgentResult) -> str:
+    ttft = result.metadata.get("ttft_ms")
+    latency = result.metadata.get("latency_ms")
+    if ttft is not None:
+        return f" · first token {ttft:,} ms"
+    if latency is not None:
+        return f" · {latency:,} ms"
+    return ""
+
+
 def build_army(
-    session_id: str, budget: BudgetTracker, memory: SessionMemory
+    session_id: str,
+    budget: BudgetTracker,
+    memory: SessionMemory,
+    clients: ClientProvider | None = None,
+    routing_cache: PersistentLRUCache | None = None,
+    long_term: LongTermMemory | None = None,
 ) -> CommanderAgent:
-    commander = CommanderAgent(session_id=session_id, budget=budget, memory=memory)
+    commander = CommanderAgent(
+        session_id=session_id,
+        budget=budget,
+        memory=memory,
+        clients=clients,
+        routing_cache=routing_cache,
+        long_term=long_term,
+    )
     for AgentClass in [DeveloperAgent, ResearcherAgent, WriterAgent, AnalystAgent]:
-        agent = AgentClass(session_id=session_id, budget=budget, memory=memory)
-        commander.register(agent)
+        commander.register_factory(
+            AgentClass.name,
+            partial(
+                AgentClass,
+                session_id=session_id,
+                budget=budget,
+                memory=memory,
+                clients=clients,
+                long_term=long_term,
+            ),
+        )
     return commander
 
 
@@ -63,15 +184,71 @@ def build_army(
 @click.option("--new-session", is_flag=True, help="Start a new interactive session")
 @click.pass_context
 def main(ctx: click.Context, new_session: bool) -> None:
+    try:
+        config.validate_storage()
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        sys.exit(1)
+
+    try:
+        rotated = rotate_if_due()
+    except (OSError, sqlite3.Error) as e:
+        console.print(f"[yellow]⚠️  Audit log rotation failed: {e}[/yellow]")
+    else:
+        if rotated is not None and rotated.rows_moved:
+            console.print(
+                f"[dim]Archived {rotated.rows_moved:,} audit log rows "
+                f"to {config.AUDIT_ARCHIVE_DIR}[/dim]"
+            )
+
     if ctx.invoked_subcommand is None:
         _run_interactive(force_new=new_session)
 
 
 @main.command()
 @click.argument("task", nargs=-1, required=True)
-def ask(task: tuple[str, ...]) -> None:
+@click.option(
+    "--plan", is_flag=True, help="Split the task across several specialists"
+)
+def ask(task: tuple[str, ...], plan: bool) -> None:
     task_str = " ".join(task)
-    _run_single(task_str)
+    _run_single(task_str, plan=plan)
+
+
+@main.command()
+@click.argument(
+    "tasks_file", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option(
+    "--concurrency", "-c", default=4, show_default=True, help="Tasks run at once"
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Results file (default: <tasks_file>.results.jsonl)",
+)
+@click.option("--max-tokens-per-task", type=int, help="Token budget for each task")
+@click.option("--max-total-tokens", type=int, help="Token budget for the whole batch")
+@click.option(
+    "--backend",
+    type=click.Choice(["live", "batches"]),
+    default="live",
+    show_default=True,
+    help="batches = submit through the Message Batches API (slower, cheaper)",
+)
+def batch(
+    tasks_file: Path,
+    concurrency: int,
+    output: Path | None,
+    max_tokens_per_task: int | None,
+    max_total_tokens: int | None,
+    backend: str,
+) -> None:
+    """Run every task in a JSONL file, writing one result line per task."""
+    _run_batch(
+        tasks_file, concurrency, output, max_tokens_per_task, max_total_tokens, backend
+    )
 
 
 @main.command()
@@ -80,32 +257,204 @@ def team() -> None:
 
 
 @main.command()
-def logs() -> None:
-    session_id = "cli-single"
-    _show_logs(session_id)
+@click.option("--session", "session_id", help="Only this session (default: last session)")
+@click.option("--agent", help="Only actions by this agent")
+@click.option("--type", "action_type", help="Only this action type, e.g. tool_call")
+@click.option("--since", help="ISO date/time, or a relative age like 30m, 12h, 7d")
+@click.option("--limit", default=100, show_default=True, help="Max rows (0 = no limit)")
+@click.option("--archive", is_flag=True, help="Also search archived partitions")
+def logs(
+    session_id: str | None,
+    agent: str | None,
+    action_type: str | None,
+    since: str | None,
+    limit: int,
+    archive: bool,
+) -> None:
+    """Stream audit log entries, oldest first."""
+    if not any((session_id, agent, action_type, since)):
+        session_id = SessionManager().get_last_session()
+    try:
+        since_ts = _parse_since(since) if since else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--since") from e
+
+    count = 0
+    for row in iter_logs(
+        session_id=session_id,
+        agent=agent,
+        action_type=action_type,
+        since=since_ts,
+        limit=limit or None,
+        include_archive=archive,
+    ):
+        count += 1
+        console.print(
+            f"[dim]{row['ts'][:19].replace('T', ' ')}[/dim] "
+            f"[dim]{escape(row['session_id'])}[/dim] "
+            f"[cyan]{escape(row['agent'])}[/cyan] {escape(row['action_type'])} "
+            f"{escape(row['action'][:60])} [dim]{row['tokens_used']}[/dim]",
+            highlight=False,
+        )
+    if not count:
+        console.print("[dim]No matching audit log entries.[/dim]")
 
 
 @main.command()
-def sessions() -> None:
+@click.option(
+    "--by",
+    "dimensions",
+    type=click.Choice(list(DIMENSIONS)),
+    multiple=True,
+    help="Breakdowns to show (repeatable; default: agent, tool, model, day)",
+)
+@click.option("--since", help="ISO date/time, or a relative age like 30m, 12h, 7d")
+@click.option("--top", default=10, show_default=True, help="Most expensive tasks to list")
+@click.option("--archive", is_flag=True, help="Include archived partitions")
+def stats(
+    dimensions: tuple[str, ...], since: str | None, top: int, archive: bool
+) -> None:
+    """Token spend, call counts and latency from the audit log."""
+    try:
+        since_ts = _parse_since(since) if since else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--since") from e
+
+    for dimension in dimensions or ("agent", "tool", "model", "day"):
+        rows = usage_by(dimension, since=since_ts, include_archive=archive)
+        if not rows:
+            continue
+        table = Table(title=f"By {dimension}", border_style="dim")
+        table.add_column(dimension.capitalize(), style="cyan")
+        table.add_column("Calls", justify="right")
+        table.add_column("Tokens", justify="right")
+        table.add_column("Cache read", justify="right")
+        table.add_column("Avg ms", justify="right")
+        table.add_column("Max ms", justify="right")
+        for row in rows:
+            avg = row.avg_latency_ms
+            table.add_row(
+                escape(row.key),
+                f"{row.calls:,}",
+                f"{row.tokens:,}",
+                f"{row.cache_read_tokens:,}",
+                f"{avg:,.0f}" if avg is not None else "-",
+                f"{row.latency_max_ms:,}" if row.latency_count else "-",
+            )
+        console.print(table)
+
+    if top > 0:
+        tasks = top_tasks(top, since=since_ts, include_archive=archive)
+        if tasks:
+            table = Table(title=f"Top {len(tasks)} tasks by tokens", border_style="dim")
+            table.add_column("Time", style="dim", no_wrap=True)
+            table.add_column("Agent", style="cyan")
+            table.add_column("Task", max_width=60)
+            table.add_column("Tokens", justify="right")
+            table.add_column("ms", justify="right")
+            for task in tasks:
+                table.add_row(
+                    task["ts"][:16].replace("T", " "),
+                    task["agent"],
+                    escape(task["action"][:60]),
+                    f"{task['tokens_used']:,}",
+                    f"{task['latency_ms']:,}" if task["latency_ms"] is not None else "-",
+                )
+            console.print(table)
+
+
+@main.group()
+def audit() -> None:
+    """Audit log maintenance."""
+
+
+@audit.command("rotate")
+def audit_rotate() -> None:
+    """Archive old audit rows now instead of waiting for the daily check."""
+    result = rotate()
+    console.print(
+        f"[dim]Moved {result.rows_moved:,} rows into "
+        f"{len(result.partitions)} partition(s); "
+        f"compressed {len(result.compressed)}.[/dim]"
+    )
+
+
+@audit.command("export")
+@click.argument("dest", type=click.Path(dir_okay=False, path_type=Path))
+@click.option("--session", "session_id", help="Only this session")
+@click.option("--since", help="ISO date/time, or a relative age like 30m, 12h, 7d")
+def audit_export(dest: Path, session_id: str | None, since: str | None) -> None:
+    """Export live and archived rows as JSONL (gzipped when DEST ends in .gz)."""
+    try:
+        since_ts = _parse_since(since) if since else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--since") from e
+    count = export_jsonl(dest, session_id=session_id, since=since_ts)
+    console.print(f"[dim]Exported {count:,} rows to {dest}[/dim]")
+
+
+_RELATIVE_AGE = re.compile(r"^(\d+)([smhdw])$")
+_AGE_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+def _parse_since(value: str) -> str:
+    match = _RELATIVE_AGE.match(value.strip().lower())
+    if match:
+        amount, unit = match.groups()
+        moment = datetime.now(UTC) - timedelta(**{_AGE_UNITS[unit]: int(amount)})
+    else:
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(
+                f"Expected an ISO date/time or an age like 12h: {value}"
+            ) from None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=UTC)
+    return moment.astimezone(UTC).isoformat()
+
+
+@main.command()
+@click.option("--search", "-s", help="Match session id or first prompt")
+@click.option("--limit", default=10, show_default=True, help="Sessions per page")
+@click.option("--page", default=1, show_default=True, help="Page number, newest first")
+@click.option("--rebuild", is_flag=True, help="Re-index from the session directories")
+def sessions(search: str | None, limit: int, page: int, rebuild: bool) -> None:
     session_manager = SessionManager()
-    all_sessions = session_manager.list_sessions()
+    if rebuild:
+        count = session_manager.rebuild_catalog()
+        console.print(f"[dim]Indexed {count:,} sessions.[/dim]")
+
+    limit = max(1, limit)
+    page = max(1, page)
+    total = session_manager.count_sessions(search=search)
+    page_sessions = session_manager.list_sessions(
+        limit=limit, offset=(page - 1) * limit, search=search
+    )
 
-    if not all_sessions:
+    if not page_sessions:
         console.print("[dim]No saved sessions found.[/dim]")
         return
 
-    table = Table(title="💾 Saved Sessions", border_style="cyan")
+    pages = (total + limit - 1) // limit
+    table = Table(
+        title="💾 Saved Sessions",
+        caption=f"Page {page}/{pages} · {total:,} sessions",
+        border_style="cyan",
+    )
     table.add_column("Session ID", style="bold cyan")
     table.add_column("Messages", justify="right")
     table.add_column("Tokens", justify="right")
     table.add_column("Last Updated", style="dim")
+    table.add_column("First prompt", max_width=50)
 
-    for session in all_sessions[:10]:
+    for session in page_sessions:
         table.add_row(
             session["session_id"],
             str(session["message_count"]),
             f"{session['token_count']:,}",
             session["last_updated"][:19],
+            escape(session["first_prompt"][:50]),
         )
 
     console.print(table)
@@ -175,7 +524,7 @@ def _show_logs(session_id: str) -> None:
     console.print(table)
 
 
-def _run_single(task: str) -> None:
+def _run_single(task: str, plan: bool = False) -> None:
     try:
         config.validate()
     except ValueError as e:
@@ -187,15 +536,16 @@ def _run_single(task: str) -> None:
     memory = SessionMemory(session_id=session_id)
     memory.set_context("created_at", datetime.now(UTC).isoformat())
     session_manager = SessionManager()
-    army = build_army(session_id, budget, memory)
-
-    with console.status("[bold cyan]Working...[/bold cyan]"):
-        result = army.dispatch(task)
+    army = build_army(
+        session_id,
+        budget,
+        memory,
+        clients=ClientProvider(summary_cache=session_manager.summary_cache()),
+        routing_cache=session_manager.routing_cache(),
+        long_term=session_manager.long_term,
+    )
 
-    if result.success:
-        console.print(Markdown(result.content))
-    else:
-        console.print(f"[red]Failed: {result.content}[/red]")
+    result = _dispatch(army, task, panel=False, plan=plan)
 
     session_manager.save_session(
         session_id=session_id,
@@ -209,7 +559,70 @@ def _run_single(task: str) -> None:
         },
     )
 
-    console.print(f"\n[dim]Tokens used: {budget.summary()}[/dim]")
+    console.print(
+        f"\n[dim]Tokens used: {budget.summary()}{_latency_summary(result)}[/dim]"
+    )
+
+
+def _run_batch(
+    tasks_file: Path,
+    concurrency: int,
+    output: Path | None,
+    max_tokens_per_task: int | None,
+    max_total_tokens: int | None,
+    backend: str = "live",
+) -> None:
+    try:
+        config.validate()
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        sys.exit(1)
+    if backend == "batches" and config.AUTH_MODE != "api_key":
+        console.print("[red]--backend batches requires AUTH_MODE=api_key.[/red]")
+        sys.exit(1)
+
+    # Nobody is watching the terminal, so HITL actions are rejected, not prompted.
+    set_interactive(False)
+
+    output = output or tasks_file.with_suffix(".results.jsonl")
+    budget = BudgetTracker(
+        session_id=f"batch-{uuid.uuid4().hex[:8]}",
+        limit=max_total_tokens or sys.maxsize,
+    )
+    session_manager = SessionManager()
+    clients = ClientProvider(summary_cache=session_manager.summary_cache())
+    runner = BatchRunner(
+        partial(
+            build_army,
+            clients=clients,
+            routing_cache=session_manager.routing_cache(),
+            long_term=session_manager.long_term,
+        ),
+        budget=budget,
+        concurrency=concurrency,
+        task_token_limit=max_tokens_per_task,
+    )
+
+    try:
+        with output.open("w", encoding="utf-8") as out:
+            if backend == "batches":
+                batches = MessageBatchRunner(clients.anthropic, budget.session_id)
+                summary = asyncio.run(
+                    runner.run_batched(read_tasks(tasks_file), out, batches)
+                )
+            else:
+                summary = asyncio.run(runner.run(read_tasks(tasks_file), out))
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        sys.exit(1)
+    finally:
+        clients.close()
+
+    console.print(
+        f"\n[dim]{summary.succeeded}/{summary.total} succeeded, "
+        f"{summary.failed} failed, {summary.skipped} skipped. "
+        f"Tokens used: {budget.tokens_used:,}. Results: {output}[/dim]"
+    )
 
 
 def _run_interactive(force_new: bool = False) -> None:
@@ -240,7 +653,7 @@ def _run_interactive(force_new: bool = False) -> None:
                 session_id = last_session_id
                 console.print(
                     f"[dim]📂 Resumed session: {session_id} "
-                    f"({len(memory.messages)} messages, {budget.tokens_used:,} tokens)[/dim]\n"
+                    f"({memory.message_count} messages, {budget.tokens_used:,} tokens)[/dim]\n"
                 )
             except Exception as e:
                 console.print(f"[yellow]⚠️  Could not resume session: {e}[/yellow]")
@@ -262,7 +675,14 @@ def _run_interactive(force_new: bool = False) -> None:
         budget = BudgetTracker(session_id=session_id)
         console.print(f"[dim]✨ Started new session: {session_id}[/dim]\n")
 
-    army = build_army(session_id, budget, memory)
+    army = build_army(
+        session_id,
+        budget,
+        memory,
+        clients=ClientProvider(summary_cache=session_manager.summary_cache()),
+        routing_cache=session_manager.routing_cache(),
+        long_term=session_manager.long_term,
+    )
 
     while True:
         try:
@@ -277,6 +697,9 @@ def _run_interactive(force_new: bool = False) -> None:
         cmd = user_input.lower()
 
         if cmd in ("exit", "quit", "bye"):
+            # Let an in-flight compaction land so its summary is saved too.
+            if army.compactor:
+                army.compactor.wait()
             session_manager.save_session(
                 session_id=session_id,
                 memory=memory,
@@ -296,27 +719,34 @@ def _run_interactive(force_new: bool = False) -> None:
             _show_team()
         elif cmd == "budget":
             console.print(f"[cyan]Budget:[/cyan] {budget.summary()}")
+            if army.compactor and army.compactor.cache is not None:
+                console.print(
+                    f"[cyan]Summary cache:[/cyan] {army.compactor.cache.summary()}"
+                )
+        elif cmd == "router":
+            if army.router is None:
+                console.print("[dim]Local router is disabled (LOCAL_ROUTER=false).[/dim]")
+            else:
+                console.print(f"[cyan]Router:[/cyan] {army.router.summary()}")
+            if army.routing_cache is not None:
+                console.print(
+                    f"[cyan]Routing cache:[/cyan] {army.routing_cache.summary()}"
+                )
         elif cmd == "log":
             _show_logs(session_id)
+        elif cmd.startswith("plan "):
+            result = _dispatch(army, user_input[5:].strip(), plan=True)
+            console.print(
+                f"[dim]Budget: {budget.summary()}{_latency_summary(result)}[/dim]"
+            )
         elif cmd == "clear":
             memory.clear()
             console.print("[dim]Conversation history cleared.[/dim]")
         else:
-            with console.status("[bold cyan]Working...[/bold cyan]"):
-                result = army.dispatch(user_input)
-
-            if result.success:
-                console.print(
-                    Panel(
-                        Markdown(result.content),
-                        border_style="cyan",
-                        padding=(1, 2),
-                    )
-                )
-            else:
-                console.print(f"[red]{result.content}[/red]")
-
-            console.print(f"[dim]Budget: {budget.summary()}[/dim]")
+            result = _dispatch(army, user_input)
+            console.print(
+                f"[dim]Budget: {budget.summary()}{_latency_summary(result)}[/dim]"
+            )
 
         session_manager.save_session(
             session_id=session_id,
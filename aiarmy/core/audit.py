@@ -1,14 +1,49 @@
-import sqlite3
+import atexit
+import gzip
 import json
+import queue
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
 from datetime import datetime, UTC
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
+from rich.console import Console
+
 from .config import config
 
+console = Console()
 
-def _get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(config.AUDIT_LOG_PATH)
+
+_ADDED_COLUMNS = {
+    "cache_read_tokens": "INTEGER DEFAULT 0",
+    "cache_write_tokens": "INTEGER DEFAULT 0",
+    "model": "TEXT",
+    "latency_ms": "INTEGER",
+}
+
+_INSERT = (
+    "INSERT INTO audit_log "
+    "(ts, session_id, agent, action_type, action, approved, result, tokens_used, "
+    "cache_read_tokens, cache_write_tokens, model, latency_ms) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_INDEXES = {
+    "idx_audit_ts": "audit_log(ts)",
+    "idx_audit_session_ts": "audit_log(session_id, ts)",
+    "idx_audit_agent_ts": "audit_log(agent, ts)",
+    "idx_audit_action_type_ts": "audit_log(action_type, ts)",
+}
+
+_Row = tuple[Any, ...]
+
+
+def _init_schema(conn: sqlite3.Connection) -> None:
     conn.execute("""
         CREATE TABLE IF NOT EXISTS audit_log (
             id          INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -22,8 +57,155 @@ def _get_conn() -> sqlite3.Connection:
             tokens_used INTEGER DEFAULT 0
         )
     """)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(audit_log)")}
+    for column, ddl in _ADDED_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE audit_log ADD COLUMN {column} {ddl}")
+    for name, target in _INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
     conn.commit()
-    return conn
+
+
+class AuditWriter:
+    """Long-lived writer for the audit log.
+
+    With ``durability="batched"`` rows are queued and a background thread
+    commits them in batches of up to ``batch_size`` rows or every
+    ``flush_interval`` seconds, whichever comes first. ``durability="full"``
+    commits (and fsyncs) each row before ``write`` returns.
+
+    Queued rows are committed at interpreter exit; a hard crash can lose at
+    most the last unflushed batch.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        durability: str = "batched",
+        batch_size: int = 100,
+        flush_interval: float = 0.2,
+    ):
+        if durability not in ("batched", "full"):
+            raise ValueError(
+                f"Invalid AUDIT_DURABILITY: {durability}. Must be 'batched' or 'full'"
+            )
+        self.path = path
+        self.durability = durability
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"PRAGMA synchronous={'FULL' if durability == 'full' else 'NORMAL'}"
+        )
+        _init_schema(self._conn)
+
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[_Row | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        if durability == "batched":
+            self._thread = threading.Thread(
+                target=self._drain, name="audit-writer", daemon=True
+            )
+            self._thread.start()
+
+    def write(self, row: _Row) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(row)
+            return
+        with self._lock:
+            self._conn.execute(_INSERT, row)
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """Block until every queued row is committed."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Commit queued rows and stop the background thread.
+
+        Rows logged afterwards (e.g. by daemon threads during interpreter
+        shutdown) are still written, synchronously.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _drain(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch: list[_Row] = []
+            stop = first is None
+            if first is not None:
+                batch.append(first)
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                else:
+                    batch.append(row)
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch: list[_Row]) -> None:
+        # One retry covers a transient SQLITE_BUSY; either way the thread
+        # must survive, or every later row would be lost too.
+        for attempt in range(2):
+            try:
+                with self._lock:
+                    self._conn.executemany(_INSERT, batch)
+                    self._conn.commit()
+                return
+            except sqlite3.Error as e:
+                with self._lock:
+                    self._conn.rollback()
+                if attempt:
+                    console.print(
+                        f"[yellow]⚠️  Could not write {len(batch)} audit rows: {e}[/yellow]"
+                    )
+                else:
+                    time.sleep(self.flush_interval)
+
+
+_writer: AuditWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> AuditWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditWriter(
+                config.AUDIT_LOG_PATH,
+                durability=config.AUDIT_DURABILITY,
+                batch_size=config.AUDIT_BATCH_SIZE,
+                flush_interval=config.AUDIT_FLUSH_INTERVAL_MS / 1000,
+            )
+            atexit.register(_writer.close)
+        return _writer
+
+
+def _get_conn() -> sqlite3.Connection:
+    # Readers see everything logged so far, including rows still queued.
+    get_writer().flush()
+    return sqlite3.connect(config.AUDIT_LOG_PATH)
 
 
 def log_action(
@@ -34,12 +216,12 @@ def log_action(
     approved: bool | None = None,
     result: str | None = None,
     tokens_used: int = 0,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0,
+    model: str | None = None,
+    latency_ms: int | None = None,
 ) -> None:
-    conn = _get_conn()
-    conn.execute(
-        "INSERT INTO audit_log "
-        "(ts, session_id, agent, action_type, action, approved, result, tokens_used) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    get_writer().write(
         (
             datetime.now(UTC).isoformat(),
             session_id,
@@ -49,28 +231,175 @@ def log_action(
             int(approved) if approved is not None else None,
             result,
             tokens_used,
-        ),
+            cache_read_tokens,
+            cache_write_tokens,
+            model,
+            latency_ms,
+        )
     )
-    conn.commit()
-    conn.close()
+
+
+def _archive_partitions(session_id: str | None, since: str | None) -> list[Path]:
+    """Archived partition files that may hold matching rows, oldest first."""
+    archive_dir = config.AUDIT_ARCHIVE_DIR
+    if not archive_dir.is_dir():
+        return []
+    names = {
+        path.name.split(".")[0]: path
+        for path in sorted(archive_dir.glob("audit-*.db*"))
+        if path.suffix in (".db", ".gz")
+    }
+    if session_id is not None:
+        catalog = archive_dir / "catalog.db"
+        if not catalog.exists():
+            return []
+        conn = sqlite3.connect(catalog)
+        try:
+            wanted = {
+                row[0]
+                for row in conn.execute(
+                    "SELECT partition FROM partitions WHERE session_id = ?",
+                    (session_id,),
+                )
+            }
+        finally:
+            conn.close()
+        names = {name: path for name, path in names.items() if name in wanted}
+    if since is not None:
+        # Partitions are monthly: audit-YYYY-MM.
+        names = {name: path for name, path in names.items() if name[6:] >= since[:7]}
+    return [names[name] for name in sorted(names)]
+
+
+_unpacked: dict[Path, tuple[float, Path]] = {}
+_unpacked_lock = threading.Lock()
+_unpack_dir: tempfile.TemporaryDirectory[str] | None = None
+
+
+def _open_partition(path: Path) -> sqlite3.Connection:
+    global _unpack_dir
+    if path.suffix != ".gz":
+        return sqlite3.connect(path)
+    # Compressed partitions are unpacked once per process into a temp dir.
+    mtime = path.stat().st_mtime
+    with _unpacked_lock:
+        cached = _unpacked.get(path)
+        if cached is not None and cached[0] == mtime and cached[1].exists():
+            target = cached[1]
+        else:
+            if _unpack_dir is None:
+                _unpack_dir = tempfile.TemporaryDirectory(prefix="aiarmy-audit-")
+            target = Path(_unpack_dir.name) / path.stem
+            with gzip.open(path, "rb") as src, target.open("wb") as dst:
+                shutil.copyfileobj(src, dst)
+            _unpacked[path] = (mtime, target)
+    return sqlite3.connect(target)
+
+
+def _iter_pages(
+    conn: sqlite3.Connection,
+    filters: list[str],
+    params: list[Any],
+    limit: int | None,
+    page_size: int,
+) -> Iterator[dict[str, Any]]:
+    remaining = limit
+    cursor_key: tuple[str, int] | None = None
+    while remaining is None or remaining > 0:
+        clauses = list(filters)
+        page_params = list(params)
+        if cursor_key is not None:
+            # Row-value form, so SQLite seeks the ts index past the cursor
+            # instead of rescanning from the start on every page.
+            clauses.append("(ts, id) > (?, ?)")
+            page_params += [cursor_key[0], cursor_key[1]]
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        page_limit = page_size if remaining is None else min(page_size, remaining)
+        cursor = conn.execute(
+            f"SELECT * FROM audit_log {where}ORDER BY ts, id LIMIT ?",
+            (*page_params, page_limit),
+        )
+        cols = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+        for row in rows:
+            yield dict(zip(cols, row))
+        if len(rows) < page_limit:
+            return
+        last = dict(zip(cols, rows[-1]))
+        cursor_key = (last["ts"], last["id"])
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def iter_logs(
+    session_id: str | None = None,
+    agent: str | None = None,
+    action_type: str | None = None,
+    since: str | None = None,
+    limit: int | None = None,
+    page_size: int = 500,
+    include_archive: bool = False,
+) -> Iterator[dict[str, Any]]:
+    """Stream audit rows in (ts, id) order, ``page_size`` rows per query.
+
+    Pages are fetched with a keyset cursor rather than OFFSET, so each page
+    is an index seek no matter how deep into the log it is. ``since`` is an
+    ISO-8601 timestamp compared against ``ts``. With ``include_archive``,
+    rotated partitions are read first; they only hold rows older than the
+    live database.
+    """
+    filters: list[str] = []
+    params: list[Any] = []
+    for column, value in (
+        ("session_id", session_id),
+        ("agent", agent),
+        ("action_type", action_type),
+    ):
+        if value is not None:
+            filters.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        filters.append("ts >= ?")
+        params.append(since)
+
+    remaining = limit
+    sources: list[Path | None] = []
+    if include_archive:
+        sources.extend(_archive_partitions(session_id, since))
+    sources.append(None)
+
+    for source in sources:
+        conn = _get_conn() if source is None else _open_partition(source)
+        try:
+            for row in _iter_pages(conn, filters, params, remaining, page_size):
+                yield row
+                if remaining is not None:
+                    remaining -= 1
+        finally:
+            conn.close()
+        if remaining is not None and remaining <= 0:
+            return
 
 
 def get_session_logs(session_id: str) -> list[dict[str, Any]]:
+    return list(iter_logs(session_id=session_id, include_archive=True))
+
+
+def get_routing_history(limit: int = 5000) -> list[tuple[str, str]]:
     conn = _get_conn()
     rows = conn.execute(
-        "SELECT * FROM audit_log WHERE session_id = ? ORDER BY ts",
-        (session_id,),
+        "SELECT action, result FROM audit_log WHERE action_type = 'route' "
+        "ORDER BY ts DESC LIMIT ?",
+        (limit,),
     ).fetchall()
     conn.close()
-    cols = [
-        "id",
-        "ts",
-        "session_id",
-        "agent",
-        "action_type",
-        "action",
-        "approved",
-        "result",
-        "tokens_used",
-    ]
-    return [dict(zip(cols, row)) for row in rows]
+
+    history: list[tuple[str, str]] = []
+    for action, result in rows:
+        try:
+            decision = json.loads(result or "")
+        except json.JSONDecodeError:
+            continue
+        if isinstance(decision, dict) and decision.get("source") == "llm":
+            history.append((action, decision.get("agent", "")))
+    return history
@@ -0,0 +1,177 @@
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from .audit import _init_schema, get_writer, iter_logs
+from .config import config
+
+_MARKER = ".last_rotation"
+_ROTATION_INTERVAL = 24 * 3600
+
+
+@dataclass
+class RotationResult:
+    rows_moved: int = 0
+    partitions: list[str] = field(default_factory=list)
+    compressed: list[str] = field(default_factory=list)
+
+
+def _month_bounds(month: str) -> tuple[str, str]:
+    start = datetime.strptime(month, "%Y-%m").replace(tzinfo=UTC)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.isoformat(), end.isoformat()
+
+
+def _gzip_file(src: Path, dest: Path) -> None:
+    tmp = dest.with_name(dest.name + ".tmp")
+    with src.open("rb") as fin, gzip.open(tmp, "wb") as fout:
+        shutil.copyfileobj(fin, fout)
+    os.replace(tmp, dest)
+
+
+def _gunzip_file(src: Path, dest: Path) -> None:
+    tmp = dest.with_name(dest.name + ".tmp")
+    with gzip.open(src, "rb") as fin, tmp.open("wb") as fout:
+        shutil.copyfileobj(fin, fout)
+    os.replace(tmp, dest)
+
+
+def _cutoff(conn: sqlite3.Connection, now: datetime) -> str | None:
+    cutoffs: list[str] = []
+    if config.AUDIT_RETENTION_DAYS > 0:
+        cutoffs.append((now - timedelta(days=config.AUDIT_RETENTION_DAYS)).isoformat())
+
+    max_bytes = config.AUDIT_MAX_MB * 1024 * 1024
+    if max_bytes > 0 and config.AUDIT_LOG_PATH.stat().st_size > max_bytes:
+        # Too big regardless of age: archive the oldest half.
+        (count,) = conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()
+        row = conn.execute(
+            "SELECT ts FROM audit_log ORDER BY ts LIMIT 1 OFFSET ?", (count // 2,)
+        ).fetchone()
+        if row is not None:
+            cutoffs.append(row[0])
+    return max(cutoffs) if cutoffs else None
+
+
+def rotate(now: datetime | None = None) -> RotationResult:
+    """Move old rows out of the live audit database into monthly partitions.
+
+    Partition ``audit-YYYY-MM.db`` holds that month's rows; once the month is
+    over it is gzipped. ``catalog.db`` maps sessions to the partitions that
+    contain them so session lookups only open what they need.
+    """
+    now = now or datetime.now(UTC)
+    result = RotationResult()
+    if not config.AUDIT_LOG_PATH.exists():
+        return result
+
+    archive_dir = config.AUDIT_ARCHIVE_DIR
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    catalog = sqlite3.connect(archive_dir / "catalog.db")
+    catalog.execute(
+        "CREATE TABLE IF NOT EXISTS partitions ("
+        "session_id TEXT NOT NULL, partition TEXT NOT NULL, "
+        "PRIMARY KEY (session_id, partition)) WITHOUT ROWID"
+    )
+    catalog.commit()
+    catalog.close()
+
+    get_writer().flush()
+    conn = sqlite3.connect(config.AUDIT_LOG_PATH, timeout=30)
+    try:
+        cutoff = _cutoff(conn, now)
+        if cutoff is None:
+            return result
+        months = [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT substr(ts, 1, 7) FROM audit_log WHERE ts < ?",
+                (cutoff,),
+            )
+        ]
+        columns = ", ".join(
+            row[1] for row in conn.execute("PRAGMA table_info(audit_log)")
+        )
+        conn.execute("ATTACH DATABASE ? AS catalog", (str(archive_dir / "catalog.db"),))
+
+        for month in months:
+            name = f"audit-{month}"
+            path = archive_dir / f"{name}.db"
+            packed = archive_dir / f"{name}.db.gz"
+            if packed.exists() and not path.exists():
+                _gunzip_file(packed, path)
+            part = sqlite3.connect(path)
+            _init_schema(part)
+            part.close()
+
+            start, end = _month_bounds(month)
+            upper = min(end, cutoff)
+            conn.execute("ATTACH DATABASE ? AS part", (str(path),))
+            try:
+                with conn:
+                    conn.execute(
+                        f"INSERT OR IGNORE INTO part.audit_log ({columns}) "
+                        f"SELECT {columns} FROM main.audit_log WHERE ts >= ? AND ts < ?",
+                        (start, upper),
+                    )
+                    conn.execute(
+                        "INSERT OR IGNORE INTO catalog.partitions (session_id, partition) "
+                        "SELECT DISTINCT session_id, ? FROM main.audit_log "
+                        "WHERE ts >= ? AND ts < ?",
+                        (name, start, upper),
+                    )
+                    moved = conn.execute(
+                        "DELETE FROM main.audit_log WHERE ts >= ? AND ts < ?",
+                        (start, upper),
+                    ).rowcount
+            finally:
+                conn.execute("DETACH DATABASE part")
+            packed.unlink(missing_ok=True)
+            result.rows_moved += moved
+            result.partitions.append(name)
+
+        conn.execute("DETACH DATABASE catalog")
+        if result.rows_moved:
+            conn.execute("VACUUM")
+            # In WAL mode the file only shrinks once the log is checkpointed.
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+    current = f"audit-{now:%Y-%m}"
+    for path in sorted(archive_dir.glob("audit-*.db")):
+        if path.stem < current:
+            _gzip_file(path, path.with_name(path.name + ".gz"))
+            path.unlink()
+            result.compressed.append(path.stem)
+    (archive_dir / _MARKER).touch()
+    return result
+
+
+def rotate_if_due() -> RotationResult | None:
+    """Rotate at most once a day; cheap enough to call on every startup."""
+    if config.AUDIT_RETENTION_DAYS <= 0 and config.AUDIT_MAX_MB <= 0:
+        return None
+    marker = config.AUDIT_ARCHIVE_DIR / _MARKER
+    if marker.exists() and time.time() - marker.stat().st_mtime < _ROTATION_INTERVAL:
+        return None
+    return rotate()
+
+
+def export_jsonl(
+    dest: Path, session_id: str | None = None, since: str | None = None
+) -> int:
+    """Write live and archived rows to a JSONL file (gzipped if it ends in .gz)."""
+    opener = gzip.open if dest.suffix == ".gz" else open
+    count = 0
+    with opener(dest, "wt", encoding="utf-8") as out:
+        for row in iter_logs(session_id=session_id, since=since, include_archive=True):
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    return count
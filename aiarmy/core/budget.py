@@ -1,30 +1,77 @@
+from __future__ import annotations
+
+import threading
 from dataclasses import dataclass, field
+from typing import Any
 
 from .config import config
 
 
+@dataclass
+class TokenUsage:
+    tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    def add_response(self, usage: Any) -> None:
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        self.tokens += usage.input_tokens + usage.output_tokens + cache_read + cache_write
+        self.cache_read_tokens += cache_read
+        self.cache_write_tokens += cache_write
+
+
 @dataclass
 class BudgetTracker:
     session_id: str
     tokens_used: int = 0
     runs: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+    limit: int | None = None
+    parent: BudgetTracker | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def max_tokens(self) -> int:
+        return self.limit if self.limit is not None else config.MAX_TOKENS_PER_SESSION
 
-    def record(self, tokens: int) -> None:
-        self.tokens_used += tokens
-        self.runs += 1
+    def record(
+        self, tokens: int, cache_read_tokens: int = 0, cache_write_tokens: int = 0
+    ) -> None:
+        with self._lock:
+            self.tokens_used += tokens
+            self.cache_read_tokens += cache_read_tokens
+            self.cache_write_tokens += cache_write_tokens
+            self.runs += 1
+        if self.parent is not None:
+            self.parent.record(tokens, cache_read_tokens, cache_write_tokens)
 
     def check_run_budget(self, estimated_tokens: int = 0) -> None:
-        if self.tokens_used + estimated_tokens > config.MAX_TOKENS_PER_SESSION:
+        if self.tokens_used + estimated_tokens > self.max_tokens:
             raise BudgetExceededError(
-                f"Session budget exceeded: {self.tokens_used}/{config.MAX_TOKENS_PER_SESSION} tokens used."
+                f"Session budget exceeded: {self.tokens_used}/{self.max_tokens} tokens used."
             )
+        if self.parent is not None:
+            self.parent.check_run_budget(estimated_tokens)
 
     def remaining(self) -> int:
-        return max(0, config.MAX_TOKENS_PER_SESSION - self.tokens_used)
+        remaining = max(0, self.max_tokens - self.tokens_used)
+        if self.parent is not None:
+            remaining = min(remaining, self.parent.remaining())
+        return remaining
 
     def summary(self) -> str:
-        pct = (self.tokens_used / config.MAX_TOKENS_PER_SESSION) * 100
-        return f"{self.tokens_used:,}/{config.MAX_TOKENS_PER_SESSION:,} tokens ({pct:.1f}%)"
+        pct = (self.tokens_used / self.max_tokens) * 100
+        summary = f"{self.tokens_used:,}/{self.max_tokens:,} tokens ({pct:.1f}%)"
+        if self.cache_read_tokens or self.cache_write_tokens:
+            summary += (
+                f", cache read {self.cache_read_tokens:,}"
+                f" / write {self.cache_write_tokens:,}"
+            )
+        return summary
 
 
 class BudgetExceededError(Exception):
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+
+class PersistentLRUCache:
+    """Small JSON-backed LRU cache with optional TTL.
+
+    Entries are kept in memory in recency order and the whole file is
+    rewritten (atomically) on every insert, so it is meant for caches of a
+    few thousand entries.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int = 1000,
+        ttl_seconds: float | None = None,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open(encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        for key, entry in data.get("entries", []):
+            self._entries[key] = entry
+        self._evict()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump({"entries": list(self._entries.items())}, f)
+        os.replace(tmp_path, self.path)
+
+    def _expired(self, entry: dict[str, Any], now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry["stored_at"] > self.ttl_seconds
+
+    def _evict(self) -> None:
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry, time.time()):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["value"]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = {"value": value, "stored_at": time.time()}
+            self._entries.move_to_end(key)
+            self._evict()
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return (
+            f"{self.hits}/{total} hits ({rate:.1f}%), "
+            f"{len(self._entries)}/{self.max_entries} entries"
+        )
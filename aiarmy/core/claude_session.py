@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import uuid
+from collections.abc import Callable
 from typing import Any
 from datetime import datetime
 
@@ -14,7 +16,14 @@ from .config import config
 class ClaudeSessionClient:
     BASE_URL = "https://claude.ai/api"
 
-    def __init__(self, session_key: str):
+    def __init__(
+        self,
+        session_key: str,
+        http: requests.Session | None = None,
+        async_http: Callable[[], requests.AsyncSession] | None = None,
+    ):
+        self._http = http if http is not None else requests
+        self._async_http = async_http
         self.cookie = (
             session_key
             if session_key.startswith("sessionKey=")
@@ -45,7 +54,7 @@ class ClaudeSessionClient:
         headers = self._get_headers()
 
         try:
-            response = requests.get(
+            response = self._http.get(
                 url, headers=headers, impersonate="chrome110", timeout=30
             )
             response.raise_for_status()
@@ -72,7 +81,7 @@ class ClaudeSessionClient:
         headers = self._get_headers()
 
         try:
-            response = requests.post(
+            response = self._http.post(
                 url,
                 headers=headers,
                 data=json.dumps(payload),
@@ -94,98 +103,118 @@ class ClaudeSessionClient:
         max_tokens: int = 8000,
         system: str = "",
         conversation_id: str | None = None,
+        on_text: Callable[[str], None] | None = None,
     ) -> tuple[str, int]:
         if not conversation_id:
             if not self.conversation_id:
                 self.create_conversation()
             conversation_id = self.conversation_id
 
-        org_id = self.get_organization_id()
-        url = f"{self.BASE_URL}/organizations/{org_id}/chat_conversations/{conversation_id}/completion"
-
-        payload = {
-            "prompt": f"{system}\n\n{prompt}" if system else prompt,
-            "timezone": "America/Chicago",
-            "attachments": [],
-            "files": [],
-        }
-
-        headers = self._get_headers(referer=f"https://claude.ai/chat/{conversation_id}")
-        headers["Accept"] = "text/event-stream"
+        url, headers, payload = self._completion_request(
+            self.get_organization_id(), conversation_id, prompt, system
+        )
 
         try:
-            response = requests.post(
+            response = self._http.post(
                 url,
                 headers=headers,
-                data=json.dumps(payload),
+                data=payload,
                 impersonate="chrome110",
                 timeout=240,
+                stream=on_text is not None,
             )
             response.raise_for_status()
 
-            return self._parse_sse_response(response.content.decode("utf-8"))
+            if on_text is None:
+                return self._parse_sse_response(response.content.decode("utf-8"))
 
-        except requests.HTTPError as e:
-            if e.response.status_code == 429:
-                error_data = e.response.json()
-                if "error" in error_data and "resets_at" in error_data["error"]:
-                    reset_time = datetime.fromtimestamp(
-                        error_data["error"]["resets_at"]
-                    ).strftime("%Y-%m-%d %H:%M:%S")
-                    raise RuntimeError(f"Rate limit exceeded. Resets at {reset_time}")
-            raise RuntimeError(f"Failed to send message: {e}")
+            try:
+                parser = _SSEParser(on_text)
+                for line in response.iter_lines():
+                    parser.feed(line)
+                return parser.result()
+            finally:
+                response.close()
 
-    def _parse_sse_response(self, data: str) -> tuple[str, int]:
-        completions = []
-        input_tokens = 0
-        output_tokens = 0
+        except requests.HTTPError as e:
+            raise self._send_error(e)
 
-        for line in data.split("\n"):
-            if not line.startswith("data: "):
-                continue
+    async def asend_message(
+        self,
+        prompt: str,
+        model: str = "claude-sonnet-4-5",
+        max_tokens: int = 8000,
+        system: str = "",
+        conversation_id: str | None = None,
+        on_text: Callable[[str], None] | None = None,
+    ) -> tuple[str, int]:
+        if not conversation_id:
+            if not self.conversation_id:
+                await asyncio.to_thread(self.create_conversation)
+            conversation_id = self.conversation_id
 
-            json_str = line[6:]
-            if not json_str.strip():
-                continue
+        org_id = await asyncio.to_thread(self.get_organization_id)
+        url, headers, payload = self._completion_request(
+            org_id, conversation_id, prompt, system
+        )
 
+        owns_session = self._async_http is None
+        http = requests.AsyncSession() if self._async_http is None else self._async_http()
+        try:
+            response = await http.post(
+                url,
+                headers=headers,
+                data=payload,
+                impersonate="chrome110",
+                timeout=240,
+                stream=True,
+            )
             try:
-                event = json.loads(json_str)
-
-                if event.get("type") == "content_block_delta":
-                    delta = event.get("delta", {})
-                    if delta.get("type") == "text_delta":
-                        completions.append(delta.get("text", ""))
-
-                if "completion" in event:
-                    completions.append(event["completion"])
-
-                if "error" in event:
-                    error = event["error"]
-                    if "resets_at" in error:
-                        reset_time = datetime.fromtimestamp(
-                            error["resets_at"]
-                        ).strftime("%Y-%m-%d %H:%M:%S")
-                        raise RuntimeError(f"Rate limit. Resets at {reset_time}")
-                    raise RuntimeError(
-                        f"API error: {error.get('message', 'Unknown error')}"
-                    )
-
-                if "usage" in event:
-                    input_tokens = event["usage"].get("input_tokens", 0)
-                    output_tokens = event["usage"].get("output_tokens", 0)
-
-            except json.JSONDecodeError:
-                continue
-
-        content = "".join(completions)
-        if not content:
-            raise RuntimeError("No response from Claude. Possible rate limit or error.")
+                response.raise_for_status()
+                parser = _SSEParser(on_text)
+                async for line in response.aiter_lines():
+                    parser.feed(line)
+                return parser.result()
+            finally:
+                await response.aclose()
 
-        total_tokens = input_tokens + output_tokens
-        if total_tokens == 0:
-            total_tokens = len(content.split()) * 2
+        except requests.HTTPError as e:
+            raise self._send_error(e)
+        finally:
+            if owns_session:
+                await http.close()
+
+    def _completion_request(
+        self, org_id: str, conversation_id: str | None, prompt: str, system: str
+    ) -> tuple[str, dict[str, str], str]:
+        url = f"{self.BASE_URL}/organizations/{org_id}/chat_conversations/{conversation_id}/completion"
 
-        return content, total_tokens
+        payload = {
+            "prompt": f"{system}\n\n{prompt}" if system else prompt,
+            "timezone": "America/Chicago",
+            "attachments": [],
+            "files": [],
+        }
+
+        headers = self._get_headers(referer=f"https://claude.ai/chat/{conversation_id}")
+        headers["Accept"] = "text/event-stream"
+        return url, headers, json.dumps(payload)
+
+    def _send_error(self, e: requests.HTTPError) -> RuntimeError:
+        if e.response.status_code == 429:
+            error_data = e.response.json()
+            if "error" in error_data and "resets_at" in error_data["error"]:
+                reset_time = datetime.fromtimestamp(
+                    error_data["error"]["resets_at"]
+                ).strftime("%Y-%m-%d %H:%M:%S")
+                return RuntimeError(f"Rate limit exceeded. Resets at {reset_time}")
+        return RuntimeError(f"Failed to send message: {e}")
+
+    def _parse_sse_response(self, data: str) -> tuple[str, int]:
+        parser = _SSEParser()
+        for line in data.split("\n"):
+            parser.feed(line)
+        return parser.result()
 
     def delete_conversation(self, conversation_id: str | None = None) -> None:
         if not conversation_id:
@@ -199,6 +228,67 @@ class ClaudeSessionClient:
         headers = self._get_headers()
 
         try:
-            requests.delete(url, headers=headers, impersonate="chrome110", timeout=30)
+            self._http.delete(url, headers=headers, impersonate="chrome110", timeout=30)
         except Exception:
             pass
+
+
+class _SSEParser:
+    def __init__(self, on_text: Callable[[str], None] | None = None):
+        self.on_text = on_text
+        self.completions: list[str] = []
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def feed(self, line: str | bytes) -> None:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.startswith("data: "):
+            return
+
+        json_str = line[6:]
+        if not json_str.strip():
+            return
+
+        try:
+            event = json.loads(json_str)
+        except json.JSONDecodeError:
+            return
+
+        text = ""
+        if event.get("type") == "content_block_delta":
+            delta = event.get("delta", {})
+            if delta.get("type") == "text_delta":
+                text += delta.get("text", "")
+
+        if "completion" in event:
+            text += event["completion"]
+
+        if text:
+            self.completions.append(text)
+            if self.on_text is not None:
+                self.on_text(text)
+
+        if "error" in event:
+            error = event["error"]
+            if "resets_at" in error:
+                reset_time = datetime.fromtimestamp(error["resets_at"]).strftime(
+                    "%Y-%m-%d %H:%M:%S"
+                )
+                raise RuntimeError(f"Rate limit. Resets at {reset_time}")
+            raise RuntimeError(f"API error: {error.get('message', 'Unknown error')}")
+
+        if "usage" in event:
+            self.input_tokens = event["usage"].get("input_tokens", 0)
+            self.output_tokens = event["usage"].get("output_tokens", 0)
+
+    def result(self) -> tuple[str, int]:
+        content = "".join(self.completions)
+        if not content:
+            raise RuntimeError("No response from Claude. Possible rate limit or error.")
+
+        total_tokens = self.input_tokens + self.output_tokens
+        if total_tokens == 0:
+            total_tokens = len(content.split()) * 2
+
+        return content, total_tokens
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import threading
+import weakref
+
+import anthropic
+import httpx
+from curl_cffi import requests
+
+from .cache import PersistentLRUCache
+from .claude_session import ClaudeSessionClient
+from .compactor import ContextCompactor
+from .config import config
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+class ClientProvider:
+    """Process-wide owner of API clients and their connection pools.
+
+    Every agent built by ``build_army`` shares one provider, so the process
+    keeps a single keep-alive pool (one TLS handshake per host) no matter
+    how many agents are constructed. ``summary_cache`` is handed to the
+    compactor it creates.
+    """
+
+    def __init__(self, summary_cache: PersistentLRUCache | None = None) -> None:
+        self.summary_cache = summary_cache
+        self._lock = threading.Lock()
+        self._anthropic: anthropic.Anthropic | None = None
+        self._http_session: requests.Session | None = None
+        self._compactor: ContextCompactor | None = None
+        # Async clients hold loop-bound connection pools, so keep one per loop.
+        self._async_anthropic: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, anthropic.AsyncAnthropic
+        ] = weakref.WeakKeyDictionary()
+        self._async_http_sessions: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, requests.AsyncSession
+        ] = weakref.WeakKeyDictionary()
+
+    @property
+    def anthropic(self) -> anthropic.Anthropic:
+        with self._lock:
+            if self._anthropic is None:
+                http_client = anthropic.DefaultHttpxClient(
+                    limits=_limits(), http2=config.HTTP2 and _http2_available()
+                )
+                self._anthropic = anthropic.Anthropic(
+                    api_key=config.ANTHROPIC_API_KEY,
+                    base_url=config.ANTHROPIC_BASE_URL or None,
+                    http_client=http_client,
+                )
+            return self._anthropic
+
+    @property
+    def compactor(self) -> ContextCompactor | None:
+        if config.AUTH_MODE != "api_key":
+            return None
+        client = self.anthropic
+        with self._lock:
+            if self._compactor is None:
+                self._compactor = ContextCompactor(
+                    client, threshold_tokens=15000, cache=self.summary_cache
+                )
+            return self._compactor
+
+    def async_anthropic(self) -> anthropic.AsyncAnthropic:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_anthropic.get(loop)
+            if client is None:
+                http_client = anthropic.DefaultAsyncHttpxClient(
+                    limits=_limits(), http2=config.HTTP2 and _http2_available()
+                )
+                client = anthropic.AsyncAnthropic(
+                    api_key=config.ANTHROPIC_API_KEY,
+                    base_url=config.ANTHROPIC_BASE_URL or None,
+                    http_client=http_client,
+                )
+                self._async_anthropic[loop] = client
+            return client
+
+    def async_http_session(self) -> requests.AsyncSession:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._async_http_sessions.get(loop)
+            if session is None:
+                session = requests.AsyncSession(max_clients=config.HTTP_MAX_CONNECTIONS)
+                self._async_http_sessions[loop] = session
+            return session
+
+    def session_client(self) -> ClaudeSessionClient:
+        # Conversations are per agent; only the underlying HTTP session is shared.
+        with self._lock:
+            if self._http_session is None:
+                self._http_session = requests.Session()
+            http_session = self._http_session
+        return ClaudeSessionClient(
+            config.CLAUDE_SESSION_KEY,
+            http=http_session,
+            async_http=self.async_http_session,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._anthropic is not None:
+                self._anthropic.close()
+                self._anthropic = None
+            if self._http_session is not None:
+                self._http_session.close()
+                self._http_session = None
+            if self._compactor is not None:
+                self._compactor.close()
+                self._compactor = None
+
+
+_provider: ClientProvider | None = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> ClientProvider:
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = ClientProvider()
+        return _provider
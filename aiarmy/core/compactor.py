@@ -1,105 +1,206 @@
 from __future__ import annotations
 
+import hashlib
 import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
 from typing import TYPE_CHECKING
 
 import anthropic
 from rich.console import Console
 
 if TYPE_CHECKING:
+    from .cache import PersistentLRUCache
     from .memory import Message, SessionMemory
 
 console = Console()
 
+# Messages per chunk summary, and how many chunk summaries the working set keeps.
+CHUNK_MESSAGES = 50
+MAX_CHUNK_SUMMARIES = 8
+SUMMARY_MODEL = "claude-sonnet-4-5"
+# Bump when the summarization prompts or model change so cached summaries
+# made the old way are not reused.
+SUMMARY_PROMPT_VERSION = 1
+
 
 class ContextCompactor:
     def __init__(
         self,
         client: anthropic.Anthropic | None,
         threshold_tokens: int = 15000,
+        window: int = 20,
+        cache: PersistentLRUCache | None = None,
     ):
         self.client = client
         self.threshold_tokens = threshold_tokens
+        self.window = window
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._pending: dict[str, Future[None]] = {}
+        self._pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="aiarmy-compact"
+        )
 
     def should_compact(self, memory: SessionMemory) -> bool:
-        return memory.estimate_tokens() > self.threshold_tokens
+        # Only history outside the window agents send can be folded into the
+        # working set; the window itself is what each request pays for.
+        outside = memory.estimate_tokens() - memory.context_tokens(self.window)
+        return outside > self.threshold_tokens
 
-    def compact(self, memory: SessionMemory) -> None:
-        if len(memory.messages) <= 20:
-            console.print("[dim]⚠️  Not enough messages to compact (need > 20)[/dim]")
-            return
+    def schedule(self, memory: SessionMemory) -> bool:
+        """Compact ``memory`` on the background worker if it needs it.
+
+        Called once a turn has finished, so no request waits on the
+        summarization call. At most one compaction per session is in flight.
+        """
+        if not self.client or not self.should_compact(memory):
+            return False
+        session_id = memory.session_id
+        with self._lock:
+            if session_id in self._pending:
+                return False
+            future = self._pool.submit(self.compact, memory, verbose=False)
+            self._pending[session_id] = future
+        future.add_done_callback(lambda _: self._forget(session_id))
+        return True
+
+    def _forget(self, session_id: str) -> None:
+        with self._lock:
+            self._pending.pop(session_id, None)
 
+    def wait(self, timeout: float | None = None) -> None:
+        """Block until background compactions finish (e.g. before a final save)."""
+        with self._lock:
+            pending = list(self._pending.values())
+        wait_futures(pending, timeout=timeout)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def compact(self, memory: SessionMemory, verbose: bool = True) -> None:
+        """Fold messages between the watermark and the window into the summary.
+
+        Each pass summarizes only messages no previous pass covered, in
+        chunks of ``CHUNK_MESSAGES``, then folds those chunk summaries into
+        the running session summary. The new working set is swapped in under
+        the memory lock together with the new watermark, which evicts the
+        covered messages from the context agents send.
+        """
         if not self.client:
-            console.print("[dim]⚠️  Compaction unavailable (session key mode)[/dim]")
+            if verbose:
+                console.print("[dim]⚠️  Compaction unavailable (session key mode)[/dim]")
             return
 
-        old_messages = memory.messages[:-20]
-        console.print(f"[dim]🗜️  Compacting {len(old_messages)} old messages...[/dim]")
+        with memory.lock:
+            start = memory.watermark
+            end = memory.message_count - self.window
+            new_messages = memory.read_range(start, end) if end > start else []
+        if not new_messages:
+            if verbose:
+                console.print("[dim]⚠️  Nothing new to compact[/dim]")
+            return
+        if verbose:
+            console.print(f"[dim]🗜️  Compacting {len(new_messages)} new messages...[/dim]")
 
         try:
-            summary = self._summarize_messages(old_messages)
-            facts = self._extract_facts(old_messages)
-            decisions = self._extract_decisions(old_messages)
-
-            if not isinstance(memory.working_set, dict):
-                memory.working_set = {}
-            memory.working_set.setdefault("summary", "")
-            memory.working_set.setdefault("pinned_facts", [])
-            memory.working_set.setdefault("decisions", [])
-
-            memory.working_set["summary"] = summary
-            memory.working_set["pinned_facts"].extend(facts)
-            memory.working_set["decisions"].extend(decisions)
-
-            memory.working_set["pinned_facts"] = list(
-                set(memory.working_set["pinned_facts"])
+            chunk_summaries = [
+                self._summarize_messages(new_messages[i : i + CHUNK_MESSAGES])
+                for i in range(0, len(new_messages), CHUNK_MESSAGES)
+            ]
+            summary = self._fold_summaries(
+                memory.working_set.get("summary", ""), chunk_summaries
             )
-            memory.working_set["decisions"] = list(set(memory.working_set["decisions"]))
+            facts = self._extract_facts(new_messages)
+            decisions = self._extract_decisions(new_messages)
 
-            console.print(
-                "[dim]✅ Compacted: "
-                f"{len(facts)} facts, {len(decisions)} decisions extracted[/dim]"
-            )
+            with memory.lock:
+                if memory.watermark != start or memory.message_count < end:
+                    return  # cleared or compacted meanwhile; this result is stale
+                current = memory.working_set if isinstance(memory.working_set, dict) else {}
+                working_set = dict(current)
+                working_set["summary"] = summary
+                working_set["chunk_summaries"] = [
+                    *current.get("chunk_summaries", []),
+                    *chunk_summaries,
+                ][-MAX_CHUNK_SUMMARIES:]
+                working_set["compacted_upto"] = end
+                working_set["pinned_facts"] = list(
+                    set(current.get("pinned_facts", [])) | set(facts)
+                )
+                working_set["decisions"] = list(
+                    set(current.get("decisions", [])) | set(decisions)
+                )
+                memory.working_set = working_set
+                memory.evict_upto(end)
+
+            if verbose:
+                console.print(
+                    "[dim]✅ Compacted: "
+                    f"{len(facts)} facts, {len(decisions)} decisions extracted[/dim]"
+                )
         except Exception as e:
             console.print(f"[dim]⚠️  Compaction failed: {e}[/dim]")
 
     def _summarize_messages(self, messages: list[Message]) -> str:
-        if not self.client:
-            return ""
+        conversation_text = "\n\n".join(f"{m.role}: {m.content[:500]}" for m in messages)
+        return self._complete(
+            "Summarize this conversation in 3-5 sentences. Focus on:\n"
+            "- What the user is trying to accomplish (main goal/project)\n"
+            "- Key decisions made\n"
+            "- Important context for future work\n"
+            "- Current state/progress\n\n"
+            "Conversation:\n"
+            f"{conversation_text}\n\n"
+            "Concise summary (3-5 sentences):"
+        )
 
-        messages_to_summarize = messages[-50:] if len(messages) > 50 else messages
-        conversation_text = "\n\n".join(
-            f"{m.role}: {m.content[:500]}" for m in messages_to_summarize
+    def _fold_summaries(self, summary: str, chunk_summaries: list[str]) -> str:
+        """Merge new chunk summaries into the running session summary."""
+        if not summary and len(chunk_summaries) == 1:
+            return chunk_summaries[0]
+        updates = "\n\n".join(chunk_summaries)
+        return self._complete(
+            "Below is the running summary of a conversation, followed by "
+            "summaries of what happened since, oldest first. Write an updated "
+            "summary in 3-5 sentences that keeps the main goal, key decisions "
+            "and current state.\n\n"
+            f"Running summary:\n{summary or '(none yet)'}\n\n"
+            f"Since then:\n{updates}\n\n"
+            "Updated summary (3-5 sentences):"
         )
 
-        try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-5",
-                max_tokens=1000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": (
-                            "Summarize this conversation in 3-5 sentences. Focus on:\n"
-                            "- What the user is trying to accomplish (main goal/project)\n"
-                            "- Key decisions made\n"
-                            "- Important context for future work\n"
-                            "- Current state/progress\n\n"
-                            "Conversation:\n"
-                            f"{conversation_text}\n\n"
-                            "Concise summary (3-5 sentences):"
-                        ),
-                    }
-                ],
-            )
-            text_parts: list[str] = []
-            for block in response.content:
-                if block.type == "text":
-                    text_parts.append(block.text)
-            return "\n".join(text_parts).strip()
-        except Exception as e:
-            console.print(f"[dim red]Summarization failed: {e}[/dim red]")
-            return "Summary unavailable due to API error."
+    def _complete(self, prompt: str) -> str:
+        """Run a summarization prompt, reusing the cached answer if any.
+
+        The prompt embeds the chunk being summarized, so resumed or forked
+        sessions and retries after a failed pass never pay for the same
+        chunk twice.
+        """
+        key = hashlib.sha256(
+            f"{SUMMARY_PROMPT_VERSION}\0{SUMMARY_MODEL}\0{prompt}".encode("utf-8")
+        ).hexdigest()
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        # Errors propagate: a failed pass must not advance the watermark.
+        assert self.client is not None
+        response = self.client.messages.create(
+            model=SUMMARY_MODEL,
+            max_tokens=1000,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        text_parts: list[str] = []
+        for block in response.content:
+            if block.type == "text":
+                text_parts.append(block.text)
+        text = "\n".join(text_parts).strip()
+        if self.cache is not None and text:
+            self.cache.set(key, text)
+        return text
 
     def _extract_facts(self, messages: list[Message]) -> list[str]:
         facts: list[str] = []
@@ -10,6 +10,7 @@ BASE_DIR = Path(__file__).parent.parent.parent
 class Config:
     AUTH_MODE: str = os.getenv("AUTH_MODE", "api_key")
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
+    ANTHROPIC_BASE_URL: str = os.getenv("ANTHROPIC_BASE_URL", "")
     CLAUDE_SESSION_KEY: str = os.getenv("CLAUDE_SESSION_KEY", "")
 
     COMMANDER_MODEL: str = os.getenv("COMMANDER_MODEL", "claude-opus-4-5")
@@ -19,6 +20,49 @@ class Config:
     MAX_TOKENS_PER_SESSION: int = int(os.getenv("MAX_TOKENS_PER_SESSION", "100000"))
     MAX_AGENT_TURNS: int = int(os.getenv("MAX_AGENT_TURNS", "10"))
 
+    STREAM_RESPONSES: bool = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+    TOOL_MAX_WORKERS: int = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+    PROMPT_CACHING: bool = os.getenv("PROMPT_CACHING", "true").lower() == "true"
+
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP2: bool = os.getenv("HTTP2", "true").lower() == "true"
+
+    LOCAL_ROUTER: bool = os.getenv("LOCAL_ROUTER", "true").lower() == "true"
+    ROUTER_CONFIDENCE_THRESHOLD: float = float(
+        os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.9")
+    )
+    ROUTING_CACHE_SIZE: int = int(os.getenv("ROUTING_CACHE_SIZE", "1000"))
+    ROUTING_CACHE_TTL_HOURS: float = float(os.getenv("ROUTING_CACHE_TTL_HOURS", "168"))
+    SUMMARY_CACHE_SIZE: int = int(os.getenv("SUMMARY_CACHE_SIZE", "500"))
+
+    PLAN_MAX_STEPS: int = int(os.getenv("PLAN_MAX_STEPS", "6"))
+    PLAN_MAX_CONCURRENCY: int = int(os.getenv("PLAN_MAX_CONCURRENCY", "4"))
+
+    CONTEXT_MAX_TOKENS: int = int(os.getenv("CONTEXT_MAX_TOKENS", "8000"))
+    CONTEXT_RECENT_PAIRS: int = int(os.getenv("CONTEXT_RECENT_PAIRS", "3"))
+
+    LTM_ENABLED: bool = os.getenv("LTM_ENABLED", "true").lower() == "true"
+    LTM_MAX_ENTRIES: int = int(os.getenv("LTM_MAX_ENTRIES", "50000"))
+    LTM_RESULTS: int = int(os.getenv("LTM_RESULTS", "3"))
+    LTM_MIN_MATCHED_TERMS: int = int(os.getenv("LTM_MIN_MATCHED_TERMS", "2"))
+
+    SESSION_SNAPSHOT_MIN_RECORDS: int = int(
+        os.getenv("SESSION_SNAPSHOT_MIN_RECORDS", "200")
+    )
+    SESSION_SEGMENT_SIZE: int = int(os.getenv("SESSION_SEGMENT_SIZE", "500"))
+    SESSION_EAGER_MESSAGES: int = int(os.getenv("SESSION_EAGER_MESSAGES", "50"))
+    SESSION_RESIDENT_MESSAGES: int = int(
+        os.getenv("SESSION_RESIDENT_MESSAGES", "1000")
+    )
+    SESSION_FSYNC: str = os.getenv("SESSION_FSYNC", "always")
+    SESSION_BACKGROUND_SAVE: bool = (
+        os.getenv("SESSION_BACKGROUND_SAVE", "true").lower() == "true"
+    )
+
+    BATCH_POLL_INTERVAL: float = float(os.getenv("BATCH_POLL_INTERVAL", "30"))
+
     HITL_REQUIRED_ACTIONS: set[str] = set(
         os.getenv(
             "HITL_REQUIRED_ACTIONS",
@@ -27,6 +71,12 @@ class Config:
     )
 
     AUDIT_LOG_PATH: Path = BASE_DIR / os.getenv("AUDIT_LOG_PATH", "logs/audit.db")
+    AUDIT_DURABILITY: str = os.getenv("AUDIT_DURABILITY", "batched")
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+    AUDIT_FLUSH_INTERVAL_MS: int = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200"))
+    AUDIT_ARCHIVE_DIR: Path = BASE_DIR / os.getenv("AUDIT_ARCHIVE_DIR", "logs/archive")
+    AUDIT_RETENTION_DAYS: int = int(os.getenv("AUDIT_RETENTION_DAYS", "30"))
+    AUDIT_MAX_MB: int = int(os.getenv("AUDIT_MAX_MB", "200"))
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
     @classmethod
@@ -48,7 +98,22 @@ class Config:
                 f"Invalid AUTH_MODE: {cls.AUTH_MODE}. Must be 'api_key' or 'session_key'"
             )
 
+        cls.validate_storage()
         cls.AUDIT_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+    @classmethod
+    def validate_storage(cls) -> None:
+        """Checks for settings every command uses, credentials or not."""
+        if cls.SESSION_FSYNC not in ("always", "snapshot", "never"):
+            raise ValueError(
+                f"Invalid SESSION_FSYNC: {cls.SESSION_FSYNC}. "
+                "Must be 'always', 'snapshot' or 'never'"
+            )
+        if cls.AUDIT_DURABILITY not in ("batched", "full"):
+            raise ValueError(
+                f"Invalid AUDIT_DURABILITY: {cls.AUDIT_DURABILITY}. "
+                "Must be 'batched' or 'full'"
+            )
+
 
 config = Config()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from .bm25 import tokenize
+from .config import config
+
+# Longest text stored per entry; recall only needs enough to jog memory.
+_MAX_ENTRY_CHARS = 2000
+_WORKING_SET_KINDS = ("summary", "fact", "decision")
+# Rows fetched per requested result before the matched-term filter.
+_CANDIDATES_PER_RESULT = 10
+
+
+@dataclass
+class Recollection:
+    session_id: str
+    # "user"/"assistant" for messages, else "summary", "fact" or "decision".
+    kind: str
+    content: str
+    ts: str
+
+
+def _query_terms(text: str) -> list[str]:
+    return list(dict.fromkeys(tokenize(text)))[:32]
+
+
+class LongTermMemory:
+    """Full-text index of past messages and working sets across all sessions.
+
+    Backed by an SQLite FTS5 table in ``memory.db``. ``SessionManager`` feeds
+    it on every save and agents query it for prior knowledge. Once it holds
+    more than ``max_entries`` rows the oldest are dropped, so the file stays
+    bounded. A row is only recalled if it shares at least ``min_terms``
+    distinct terms with the query (fewer if the query has fewer).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int | None = None,
+        min_terms: int | None = None,
+    ):
+        self.path = path
+        self.max_entries = (
+            config.LTM_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self.min_terms = (
+            config.LTM_MIN_MATCHED_TERMS if min_terms is None else min_terms
+        )
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Must precede the first table so freed pages can be returned.
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS memory USING fts5("
+            "content, session_id UNINDEXED, kind UNINDEXED, ts UNINDEXED)"
+        )
+        self._conn.commit()
+
+    def add_messages(self, session_id: str, messages: list[tuple[str, str]]) -> None:
+        """Index ``(role, content)`` pairs newly added to a session."""
+        ts = datetime.now(UTC).isoformat()
+        rows = [
+            (content[:_MAX_ENTRY_CHARS], session_id, role, ts)
+            for role, content in messages
+            if content.strip()
+        ]
+        if rows:
+            self._insert(rows)
+
+    def set_working_set(self, session_id: str, working_set: dict[str, Any]) -> None:
+        """Replace the summary, facts and decisions indexed for a session."""
+        ts = datetime.now(UTC).isoformat()
+        rows = [
+            (str(text)[:_MAX_ENTRY_CHARS], session_id, kind, ts)
+            for kind, texts in (
+                ("summary", [working_set.get("summary") or ""]),
+                ("fact", working_set.get("pinned_facts") or []),
+                ("decision", working_set.get("decisions") or []),
+            )
+            for text in texts
+            if str(text).strip()
+        ]
+        placeholders = ", ".join("?" * len(_WORKING_SET_KINDS))
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM memory WHERE session_id = ? AND kind IN ({placeholders})",
+                (session_id, *_WORKING_SET_KINDS),
+            )
+            self._conn.commit()
+        if rows:
+            self._insert(rows)
+
+    def search(
+        self, text: str, limit: int = 5, exclude_session: str | None = None
+    ) -> list[Recollection]:
+        """Best BM25 matches for ``text``, optionally skipping one session.
+
+        Empty when no row shares enough terms with ``text``.
+        """
+        terms = _query_terms(text)
+        if not terms or limit <= 0:
+            return []
+        sql = "SELECT session_id, kind, content, ts FROM memory WHERE memory MATCH ?"
+        params: list[Any] = [" OR ".join(f'"{term}"' for term in terms)]
+        if exclude_session is not None:
+            sql += " AND session_id != ?"
+            params.append(exclude_session)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit * _CANDIDATES_PER_RESULT)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        # The OR query matches on any single shared word; require more.
+        required = min(len(terms), self.min_terms)
+        wanted = set(terms)
+        matches = [
+            Recollection(*row)
+            for row in rows
+            if len(wanted.intersection(tokenize(row[2]))) >= required
+        ]
+        return matches[:limit]
+
+    def count(self) -> int:
+        with self._lock:
+            (total,) = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()
+        return total
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _insert(self, rows: list[tuple[str, str, str, str]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO memory (content, session_id, kind, ts) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            (last_rowid,) = self._conn.execute("SELECT MAX(rowid) FROM memory").fetchone()
+            # Rowids only grow, so everything at or below this is the oldest
+            # overflow.
+            cutoff = last_rowid - self.max_entries
+            if cutoff > 0 and self._conn.execute(
+                "SELECT 1 FROM memory WHERE rowid <= ? LIMIT 1", (cutoff,)
+            ).fetchone():
+                self._conn.execute("DELETE FROM memory WHERE rowid <= ?", (cutoff,))
+                self._conn.commit()
+                self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.commit()
+
+
+_instances: dict[Path, LongTermMemory] = {}
+_instances_lock = threading.Lock()
+
+
+def get_long_term_memory(path: Path | None = None) -> LongTermMemory:
+    """Shared index for ``path`` (default ``~/.aiarmy/memory.db``)."""
+    if path is None:
+        path = Path.home() / ".aiarmy" / "memory.db"
+    with _instances_lock:
+        if path not in _instances:
+            _instances[path] = LongTermMemory(path)
+        return _instances[path]
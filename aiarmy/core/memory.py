@@ -1,17 +1,62 @@
+from __future__ import annotations
+
+import sys
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass, field
+from itertools import islice
 from typing import Any
 
+from .bm25 import BM25Index
 
-@dataclass
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token), rounded up."""
+    return (len(text) + 3) // 4
+
+
+@dataclass(slots=True)
 class Message:
     role: str
     content: str
+    tokens: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Only a handful of distinct roles exist; share one string for each.
+        self.role = sys.intern(self.role)
+        self.tokens = count_tokens(self.content)
+
+
+_TRUNCATED = "\n[… truncated]"
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Head of ``text`` that fits in ``max_tokens`` along with a marker."""
+    keep = max(max_tokens * 4 - len(_TRUNCATED), 0)
+    return text[:keep] + _TRUNCATED
+
+
+# Returns stored messages [start, end) of a session.
+MessageLoader = Callable[[int, int], list[Message]]
 
 
 @dataclass
 class SessionMemory:
+    """Conversation state for one session.
+
+    ``messages`` may be only the newest part of the conversation: resumed
+    sessions keep the first ``offset`` messages on disk and page them in
+    through ``loader`` when asked, and ``offload`` drops stored ones again.
+    It is a deque so both ends change in O(1).
+
+    Messages before ``watermark`` are covered by the working-set summary:
+    they stay stored but no longer count toward ``estimate_tokens`` or get
+    selected for context.
+    """
+
     session_id: str
-    messages: list[Message] = field(default_factory=list)
+    messages: deque[Message] = field(default_factory=deque)
     context: dict[str, Any] = field(default_factory=dict)
     working_set: dict[str, Any] = field(
         default_factory=lambda: {
@@ -23,34 +68,246 @@ class SessionMemory:
             "recent_messages": [],
         }
     )
+    offset: int = 0
+    loader: MessageLoader | None = field(default=None, repr=False, compare=False)
+    # Guards ``messages``, ``offset`` and the derived state below: plan steps
+    # run agents sharing one memory on several threads.
+    lock: threading.RLock = field(
+        default_factory=threading.RLock, init=False, repr=False, compare=False
+    )
+    watermark: int = field(default=0, init=False, compare=False)
+    # Running total of ``m.tokens`` over resident messages past the watermark.
+    _tokens: int = field(default=0, init=False, repr=False, compare=False)
+    # BM25 over the same messages, keyed by absolute message index.
+    _index: BM25Index = field(
+        default_factory=BM25Index, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        if not isinstance(self.messages, deque):
+            self.messages = deque(self.messages)
+        self._reindex()
+
+    @property
+    def message_count(self) -> int:
+        return self.offset + len(self.messages)
+
+    def attach_history(self, offset: int, loader: MessageLoader) -> None:
+        """Treat the first ``offset`` messages as stored, paged in through ``loader``.
+
+        Resident messages are renumbered to follow them.
+        """
+        with self.lock:
+            self.offset = offset
+            self.loader = loader
+            self._reindex()
+
+    def load_older(self, count: int) -> int:
+        """Page up to ``count`` older messages in from storage; returns how many."""
+        with self.lock:
+            if self.loader is None or self.offset == 0 or count <= 0:
+                return 0
+            start = max(0, self.offset - count)
+            older = self.loader(start, self.offset)
+            self.messages.extendleft(reversed(older))
+            self.offset = start
+            for i, message in enumerate(older, start):
+                if i >= self.watermark:
+                    self._tokens += message.tokens
+                    self._index.add(i, message.content)
+            return len(older)
+
+    def offload(self, upto: int) -> int:
+        """Drop in-memory messages before absolute index ``upto``.
+
+        Only valid for messages the loader can return; returns how many.
+        """
+        with self.lock:
+            if self.loader is None:
+                return 0
+            dropped = 0
+            while self.offset < upto and self.messages:
+                message = self.messages.popleft()
+                if self.offset >= self.watermark:
+                    self._tokens -= message.tokens
+                    self._index.remove(self.offset)
+                self.offset += 1
+                dropped += 1
+            return dropped
+
+    def evict_upto(self, index: int) -> None:
+        """Move the watermark to ``index`` once a summary covers what precedes it."""
+        with self.lock:
+            for i in range(max(self.watermark, self.offset), min(index, self.message_count)):
+                self._tokens -= self._at(i).tokens
+                self._index.remove(i)
+            self.watermark = max(self.watermark, index)
+
+    def read_range(self, start: int, end: int) -> list[Message]:
+        """Messages ``[start, end)``, paging stored ones in without keeping them."""
+        with self.lock:
+            start, end = max(start, 0), min(end, self.message_count)
+            resident = [self._at(i) for i in range(max(start, self.offset), end)]
+            if start >= self.offset or self.loader is None:
+                return resident
+            return self.loader(start, min(end, self.offset)) + resident
+
+    def iter_all(self, page_size: int = 500) -> Iterator[Message]:
+        """Every message oldest first, streaming stored ones without keeping them."""
+        with self.lock:
+            offset, loader, resident = self.offset, self.loader, list(self.messages)
+        if loader is not None:
+            for start in range(0, offset, page_size):
+                yield from loader(start, min(start + page_size, offset))
+        yield from resident
 
     def add(self, role: str, content: str) -> None:
-        self.messages.append(Message(role=role, content=content))
+        with self.lock:
+            self._append(Message(role=role, content=content))
+
+    def add_exchange(self, prompt: str, answer: str) -> None:
+        """Record a user turn and its reply back to back."""
+        with self.lock:
+            self._append(Message(role="user", content=prompt))
+            self._append(Message(role="assistant", content=answer))
+
+    def _append(self, message: Message) -> None:
+        self._index.add(self.message_count, message.content)
+        self.messages.append(message)
+        self._tokens += message.tokens
 
     def to_api_format(self) -> list[dict[str, str]]:
-        return [{"role": m.role, "content": m.content} for m in self.messages]
+        with self.lock:
+            return [{"role": m.role, "content": m.content} for m in self.messages]
 
     def trim_to_last_n(self, n: int = 20) -> None:
-        if len(self.messages) > n:
-            self.messages = self.messages[-n:]
+        with self.lock:
+            if len(self.messages) > n:
+                for _ in range(len(self.messages) - n):
+                    self.messages.popleft()
+                self._reindex()
+
+    def _reindex(self) -> None:
+        self._tokens = 0
+        self._index = BM25Index()
+        for i, message in enumerate(self.messages, self.offset):
+            if i >= self.watermark:
+                self._tokens += message.tokens
+                self._index.add(i, message.content)
 
     def estimate_tokens(self) -> int:
-        total_chars = sum(len(m.content) for m in self.messages)
-        return total_chars // 4
+        """Tokens held in ``messages``; kept up to date, so this is O(1)."""
+        return self._tokens
+
+    def context_tokens(self, max_messages: int = 20) -> int:
+        """Tokens in exactly what ``get_llm_context(max_messages)`` returns."""
+        with self.lock:
+            return sum(m.tokens for m in self._newest(max_messages))
 
     def get_llm_context(self, max_messages: int = 20) -> list[Message]:
-        return self.messages[-max_messages:]
+        with self.lock:
+            newest = list(self._newest(max_messages))
+        newest.reverse()
+        return newest
+
+    def relevant_context(
+        self, query: str, max_tokens: int, recent_pairs: int = 2
+    ) -> list[Message]:
+        """User/assistant exchanges worth sending for ``query``, oldest first.
+
+        The newest exchange always goes in, its user side cut down if the pair
+        alone exceeds ``max_tokens``. Then the other ``recent_pairs - 1``
+        newest exchanges, then older ones by BM25 relevance to ``query``, as
+        long as they fit in what is left.
+        """
+        with self.lock:
+            chosen: set[int] = set()
+            used = 0
+            # Stand-ins for messages that were cut to fit.
+            replaced: dict[int, Message] = {}
+
+            def take(start: int) -> bool:
+                nonlocal used
+                pair_tokens = self._at(start).tokens + self._at(start + 1).tokens
+                if used + pair_tokens > max_tokens:
+                    return False
+                chosen.add(start)
+                used += pair_tokens
+                return True
+
+            recent = islice(self._recent_pairs(), recent_pairs)
+            newest = next(recent, None)
+            if newest is not None:
+                prompt, answer = self._at(newest), self._at(newest + 1)
+                room = max(max_tokens - answer.tokens, 0)
+                if prompt.tokens > room:
+                    prompt = Message(prompt.role, _truncate(prompt.content, room))
+                    replaced[newest] = prompt
+                chosen.add(newest)
+                used = prompt.tokens + answer.tokens
+            for start in recent:
+                take(start)
+
+            pair_scores: dict[int, float] = {}
+            for doc_id, score in self._index.score(query).items():
+                start = self._pair_start(doc_id)
+                if start is not None and start not in chosen:
+                    pair_scores[start] = pair_scores.get(start, 0.0) + score
+            for start in sorted(pair_scores, key=pair_scores.__getitem__, reverse=True):
+                take(start)
+
+            selected: list[Message] = []
+            for start in sorted(chosen):
+                prompt = replaced.get(start) or self._at(start)
+                selected += (prompt, self._at(start + 1))
+            return selected
+
+    def _at(self, index: int) -> Message:
+        return self.messages[index - self.offset]
+
+    def _is_pair(self, start: int) -> bool:
+        return (
+            max(self.offset, self.watermark) <= start
+            and start + 1 < self.message_count
+            and self._at(start).role == "user"
+            and self._at(start + 1).role == "assistant"
+        )
+
+    def _pair_start(self, index: int) -> int | None:
+        for start in (index, index - 1):
+            if self._is_pair(start):
+                return start
+        return None
+
+    def _recent_pairs(self) -> Iterator[int]:
+        start = self.message_count - 2
+        while start >= max(self.offset, self.watermark):
+            if self._is_pair(start):
+                yield start
+                start -= 2
+            else:
+                start -= 1
+
+    def _newest(self, n: int) -> Iterable[Message]:
+        """The last ``n`` messages past the watermark, newest first, without
+        copying the rest."""
+        return islice(
+            reversed(self.messages), max(min(n, self.message_count - self.watermark), 0)
+        )
 
     def add_pinned_fact(self, fact: str) -> None:
-        if fact not in self.working_set["pinned_facts"]:
-            self.working_set["pinned_facts"].append(fact)
+        with self.lock:
+            if fact not in self.working_set["pinned_facts"]:
+                self.working_set["pinned_facts"].append(fact)
 
     def add_decision(self, decision: str) -> None:
-        if decision not in self.working_set["decisions"]:
-            self.working_set["decisions"].append(decision)
+        with self.lock:
+            if decision not in self.working_set["decisions"]:
+                self.working_set["decisions"].append(decision)
 
     def update_summary(self, summary: str) -> None:
-        self.working_set["summary"] = summary
+        with self.lock:
+            self.working_set["summary"] = summary
 
     def set_context(self, key: str, value: Any) -> None:
         self.context[key] = value
@@ -59,5 +316,12 @@ class SessionMemory:
         return self.context.get(key, default)
 
     def clear(self) -> None:
-        self.messages.clear()
+        with self.lock:
+            self.messages.clear()
+            self.offset = 0
+            self.loader = None
+            self.watermark = 0
+            if isinstance(self.working_set, dict):
+                self.working_set.pop("compacted_upto", None)
+            self._reindex()
         self.context.clear()
@@ -1,3 +1,5 @@
+import threading
+
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Confirm
@@ -7,6 +9,9 @@ from .audit import log_action
 
 console = Console()
 
+_approval_lock = threading.Lock()
+_interactive = True
+
 PROMPT_INJECTION_PATTERNS = [
     "ignore previous",
     "ignore all previous",
@@ -36,12 +41,43 @@ def requires_hitl(action_type: str) -> bool:
     return action_type in config.HITL_REQUIRED_ACTIONS
 
 
+def set_interactive(enabled: bool) -> None:
+    """Unattended runs (e.g. ``aiarmy batch``) reject HITL actions instead of prompting."""
+    global _interactive
+    _interactive = enabled
+
+
 def request_human_approval(
     session_id: str,
     agent: str,
     action_type: str,
     action_description: str,
     details: str = "",
+) -> bool:
+    if not _interactive:
+        log_action(
+            session_id=session_id,
+            agent=agent,
+            action_type=action_type,
+            action=action_description,
+            approved=False,
+            result="rejected_noninteractive",
+        )
+        return False
+
+    # Agents running in parallel must not interleave approval prompts.
+    with _approval_lock:
+        return _prompt_for_approval(
+            session_id, agent, action_type, action_description, details
+        )
+
+
+def _prompt_for_approval(
+    session_id: str,
+    agent: str,
+    action_type: str,
+    action_description: str,
+    details: str,
 ) -> bool:
     console.print()
     console.print(
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+_COLUMNS = (
+    "session_id",
+    "created_at",
+    "last_updated",
+    "message_count",
+    "token_count",
+    "first_prompt",
+)
+
+
+_UPSERT = (
+    f"INSERT INTO sessions ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(session_id) DO UPDATE SET "
+    "last_updated = excluded.last_updated, "
+    "message_count = excluded.message_count, "
+    "token_count = excluded.token_count, "
+    "first_prompt = CASE WHEN excluded.first_prompt != '' "
+    "THEN excluded.first_prompt ELSE sessions.first_prompt END"
+)
+
+
+def _row(metadata: dict[str, Any]) -> tuple[Any, ...]:
+    return (
+        metadata["session_id"],
+        metadata.get("created_at") or metadata.get("last_updated", ""),
+        metadata.get("last_updated", ""),
+        metadata.get("message_count", 0),
+        metadata.get("token_count", 0),
+        metadata.get("first_prompt") or "",
+    )
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SessionCatalog:
+    """SQLite index of saved sessions, kept up to date by ``SessionManager``.
+
+    Listing and searching read ``sessions.db`` instead of opening every
+    session's ``metadata.json``; the directory scan is only used by
+    ``rebuild``.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.created = not path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id    TEXT PRIMARY KEY,
+                created_at    TEXT NOT NULL,
+                last_updated  TEXT NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                token_count   INTEGER NOT NULL DEFAULT 0,
+                first_prompt  TEXT NOT NULL DEFAULT ''
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(last_updated)"
+        )
+        self._conn.commit()
+
+    def upsert(self, metadata: dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(_UPSERT, _row(metadata))
+            self._conn.commit()
+
+    def list(
+        self, limit: int | None = None, offset: int = 0, search: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Sessions newest first, optionally filtered by id or first prompt."""
+        where, params = self._search_clause(search)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM sessions {where}"
+                "ORDER BY last_updated DESC LIMIT ? OFFSET ?",
+                (*params, -1 if limit is None else limit, offset),
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def count(self, search: str | None = None) -> int:
+        where, params = self._search_clause(search)
+        with self._lock:
+            (total,) = self._conn.execute(
+                f"SELECT COUNT(*) FROM sessions {where}", params
+            ).fetchone()
+        return total
+
+    def rebuild(self, sessions_dir: Path) -> int:
+        """Re-index from each session's metadata.json."""
+        rows: list[tuple[Any, ...]] = []
+        for session_dir in sessions_dir.iterdir():
+            metadata_file = session_dir / "metadata.json"
+            if not metadata_file.is_file():
+                continue
+            try:
+                with metadata_file.open(encoding="utf-8") as f:
+                    rows.append(_row(json.load(f)))
+            except (OSError, KeyError, json.JSONDecodeError):
+                continue
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions")
+            self._conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    @staticmethod
+    def _search_clause(search: str | None) -> tuple[str, tuple[str, ...]]:
+        if not search:
+            return "", ()
+        pattern = _like_pattern(search)
+        return (
+            "WHERE session_id LIKE ? ESCAPE '\\' OR first_prompt LIKE ? ESCAPE '\\' ",
+            (pattern, pattern),
+        )
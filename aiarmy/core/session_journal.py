@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+SNAPSHOT_FILE = "snapshot.json"
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows, where directories can't be opened
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: Path, data: bytes, fsync: bool = False) -> None:
+    """Write via a temp file and rename, so readers never see a partial file."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("wb") as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if fsync:
+        _fsync_dir(path.parent)
+
+
+def atomic_write_text(path: Path, text: str, fsync: bool = False) -> None:
+    atomic_write_bytes(path, text.encode("utf-8"), fsync=fsync)
+
+
+def _journal_name(generation: int) -> str:
+    return f"journal-{generation:06d}.jsonl"
+
+
+def empty_session_data() -> dict[str, Any]:
+    return {
+        "messages": [],
+        "sealed": 0,
+        "context": {},
+        "working_set": None,
+        "state": {},
+    }
+
+
+def _apply(data: dict[str, Any], record: dict[str, Any]) -> None:
+    op = record.get("op")
+    if op == "message":
+        data["messages"].append({"role": record["role"], "content": record["content"]})
+    elif op in ("context", "working_set", "state"):
+        data[op] = record["value"]
+
+
+class MessageSegments:
+    """Sealed, gzip-compressed runs of ``size`` messages.
+
+    Segment ``i`` holds messages ``[i * size, (i + 1) * size)`` and is never
+    rewritten, so old history costs nothing until something pages it in.
+    """
+
+    def __init__(self, directory: Path, size: int):
+        self.dir = directory
+        self.size = size
+        self._cached: tuple[int, list[dict[str, Any]]] | None = None
+
+    def _path(self, index: int) -> Path:
+        return self.dir / f"seg-{index:06d}.jsonl.gz"
+
+    def write(
+        self, index: int, messages: list[dict[str, Any]], fsync: bool = False
+    ) -> None:
+        self.dir.mkdir(exist_ok=True)
+        payload = "".join(json.dumps(m, ensure_ascii=False) + "\n" for m in messages)
+        atomic_write_bytes(
+            self._path(index), gzip.compress(payload.encode("utf-8")), fsync=fsync
+        )
+
+    def read(self, start: int, end: int) -> list[dict[str, Any]]:
+        messages: list[dict[str, Any]] = []
+        index = start // self.size
+        while index * self.size < end:
+            base = index * self.size
+            messages.extend(self._load(index)[max(start - base, 0) : end - base])
+            index += 1
+        return messages
+
+    def clear(self) -> None:
+        if self.dir.is_dir():
+            for path in self.dir.glob("seg-*.jsonl.gz"):
+                path.unlink()
+        self._cached = None
+
+    def _load(self, index: int) -> list[dict[str, Any]]:
+        if self._cached is not None and self._cached[0] == index:
+            return self._cached[1]
+        with gzip.open(self._path(index), "rt", encoding="utf-8") as f:
+            messages = [json.loads(line) for line in f]
+        self._cached = (index, messages)
+        return messages
+
+
+class SessionJournal:
+    """Snapshot plus append-only JSONL journal for one session directory.
+
+    ``snapshot.json`` carries a generation number and the journal for that
+    generation (``journal-NNNNNN.jsonl``) holds every change made since.
+    Writing a new snapshot starts a new generation, so a crash between the
+    snapshot and deleting the old journal never replays records twice.
+
+    Messages already sealed into ``segments/`` are in neither file: the
+    snapshot only records how many there are (``sealed``), so loading costs
+    the same however long the session has run.
+    """
+
+    def __init__(self, session_dir: Path):
+        self.dir = session_dir
+        self.generation = 0
+        self.records = 0
+
+    @property
+    def journal_path(self) -> Path:
+        return self.dir / _journal_name(self.generation)
+
+    def exists(self) -> bool:
+        return (self.dir / SNAPSHOT_FILE).exists()
+
+    def load(self) -> dict[str, Any] | None:
+        snapshot_path = self.dir / SNAPSHOT_FILE
+        if not snapshot_path.exists():
+            return None
+        with snapshot_path.open(encoding="utf-8") as f:
+            data = {**empty_session_data(), **json.load(f)}
+        self.generation = data.pop("generation", 0)
+        self.records = 0
+
+        journal = self.journal_path
+        if not journal.exists():
+            return data
+        good_offset = 0
+        with journal.open("rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                _apply(data, record)
+                self.records += 1
+                good_offset += len(line)
+        # Drop a torn tail left by a crash mid-append so later appends stay
+        # on line boundaries.
+        if good_offset < journal.stat().st_size:
+            with journal.open("r+b") as f:
+                f.truncate(good_offset)
+        return data
+
+    def append(self, records: list[dict[str, Any]], fsync: bool = False) -> None:
+        if not records:
+            return
+        payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with self.journal_path.open("a", encoding="utf-8") as f:
+            f.write(payload)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self.records += len(records)
+
+    def snapshot(self, data: dict[str, Any], fsync: bool = False) -> None:
+        old_journal = self.journal_path
+        self.generation += 1
+        atomic_write_text(
+            self.dir / SNAPSHOT_FILE,
+            json.dumps({**data, "generation": self.generation}, ensure_ascii=False),
+            fsync=fsync,
+        )
+        old_journal.unlink(missing_ok=True)
+        self.records = 0
@@ -1,84 +1,418 @@
 from __future__ import annotations
 
+import atexit
 import json
+import sqlite3
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from pathlib import Path
+from typing import Any
 
-from .memory import SessionMemory
+from rich.console import Console
+
+from .cache import PersistentLRUCache
+from .config import config
+from .long_term_memory import LongTermMemory, get_long_term_memory
+from .memory import Message, MessageLoader, SessionMemory
+from .session_catalog import SessionCatalog
+from .session_journal import (
+    MessageSegments,
+    SessionJournal,
+    atomic_write_text,
+    empty_session_data,
+)
+
+console = Console()
+
+_LEGACY_FILES = ("full.json", "working.json", "state.json")
+_FIELDS = ("context", "working_set", "state")
+_SEGMENTS_DIR = "segments"
+
+
+def _segment_loader(segments: MessageSegments) -> MessageLoader:
+    # A reader of its own: the saver thread keeps writing through the other.
+    reader = MessageSegments(segments.dir, segments.size)
+    return lambda start, end: [
+        Message(role=m["role"], content=m["content"]) for m in reader.read(start, end)
+    ]
+
+
+@dataclass
+class _Persisted:
+    """What the journal already holds for a session, to diff the next save against."""
+
+    journal: SessionJournal
+    segments: MessageSegments
+    message_count: int = 0
+    sealed: int = 0
+    # Unsealed messages the snapshot was written with.
+    snapshot_size: int = 0
+    fields: dict[str, str] = field(default_factory=dict)
+
+    def remember(self, data: dict[str, Any]) -> None:
+        self.sealed = data["sealed"]
+        self.snapshot_size = len(data["messages"])
+        self.message_count = self.sealed + self.snapshot_size
+        self.fields = {
+            name: json.dumps(data.get(name), sort_keys=True) for name in _FIELDS
+        }
+
+
+@dataclass
+class _SaveRequest:
+    """A point-in-time copy of a session, safe to persist from another thread."""
+
+    session_id: str
+    messages: list[Message]
+    offset: int
+    fields: dict[str, str]
+    created_at: str
+    tokens_used: int
+    first_prompt: str
+
+
+class _BackgroundSaver:
+    """Runs saves on a worker thread.
+
+    At most one save is queued or running at a time: a new submit first waits
+    for the previous one, so a crash can only lose the latest turn.
+    """
+
+    def __init__(self, save: Callable[[_SaveRequest], None]):
+        self._save = save
+        self._next: _SaveRequest | None = None
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._loop, name="session-saver", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _idle(self) -> bool:
+        return self._next is None and not self._busy
+
+    def submit(self, request: _SaveRequest) -> None:
+        with self._cond:
+            self._cond.wait_for(self._idle)
+            self._next = request
+            self._cond.notify_all()
+
+    def flush(self) -> None:
+        with self._cond:
+            self._cond.wait_for(self._idle)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._next is not None)
+                request, self._next = self._next, None
+                self._busy = True
+            assert request is not None
+            try:
+                self._save(request)
+            except Exception as e:
+                console.print(
+                    f"[yellow]⚠️  Could not save session {request.session_id}: {e}[/yellow]"
+                )
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
 
 
 class SessionManager:
-    def __init__(self, base_dir: Path | None = None):
+    def __init__(self, base_dir: Path | None = None, background: bool | None = None):
         if base_dir is None:
             base_dir = Path.home() / ".aiarmy"
         self.base_dir = Path(base_dir)
         self.sessions_dir = self.base_dir / "sessions"
         self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self._persisted: dict[str, _Persisted] = {}
+        self._current_session: str | None = None
+        self._io_lock = threading.Lock()
+        self.catalog = SessionCatalog(self.base_dir / "sessions.db")
+        if self.catalog.created:
+            self.catalog.rebuild(self.sessions_dir)
+        self.long_term: LongTermMemory | None = (
+            get_long_term_memory(self.base_dir / "memory.db")
+            if config.LTM_ENABLED
+            else None
+        )
+
+        self._background = (
+            config.SESSION_BACKGROUND_SAVE if background is None else background
+        )
+        self._saver: _BackgroundSaver | None = None
 
     def save_session(self, session_id: str, memory: SessionMemory, state: dict) -> None:
+        """Persist what changed since the last save of this session.
+
+        New messages and changed context/working set/state are appended to
+        the session journal; a snapshot is written only when the journal
+        outgrows it or the message list shrank (e.g. ``clear``), and full
+        runs of old messages are then sealed into compressed segments. With a
+        background saver this returns immediately and the write happens on
+        the saver thread.
+        """
+        self._offload(session_id, memory)
+        with memory.lock:
+            messages, offset = list(memory.messages), memory.offset
+            working_set = json.dumps(memory.working_set, sort_keys=True)
+        request = _SaveRequest(
+            session_id=session_id,
+            messages=messages,
+            offset=offset,
+            fields={
+                "context": json.dumps(memory.context, sort_keys=True),
+                "working_set": working_set,
+                "state": json.dumps(state, sort_keys=True),
+            },
+            created_at=state.get("created_at", datetime.now(UTC).isoformat()),
+            tokens_used=state.get("tokens_used", 0),
+            # Only known when the start of the conversation is in memory;
+            # the catalog keeps the stored one otherwise.
+            first_prompt=""
+            if offset
+            else next((m.content[:200] for m in messages if m.role == "user"), ""),
+        )
+        if not self._background:
+            self._save(request)
+            return
+        if self._saver is None:
+            self._saver = _BackgroundSaver(self._save)
+        self._saver.submit(request)
+
+    def _offload(self, session_id: str, memory: SessionMemory) -> None:
+        """Drop sealed messages beyond SESSION_RESIDENT_MESSAGES from memory."""
+        resident = config.SESSION_RESIDENT_MESSAGES
+        persisted = self._persisted.get(session_id)
+        if not resident or len(memory.messages) <= resident or persisted is None:
+            return
+        # ``sealed`` only grows, and only once its segments are on disk, so a
+        # value read while a background save runs is still safe to use.
+        sealed = persisted.sealed
+        if sealed <= memory.offset:
+            return
+        if memory.loader is None:
+            memory.loader = _segment_loader(persisted.segments)
+        memory.offload(min(sealed, memory.message_count - resident))
+
+    def flush(self) -> None:
+        """Wait for queued background saves to reach disk."""
+        if self._saver is not None:
+            self._saver.flush()
+
+    def _save(self, request: _SaveRequest) -> None:
+        with self._io_lock:
+            self._write(request)
+
+    def _write(self, request: _SaveRequest) -> None:
+        session_id = request.session_id
         session_dir = self.sessions_dir / session_id
         session_dir.mkdir(exist_ok=True)
+        fsync_journal = config.SESSION_FSYNC == "always"
+        fsync_files = config.SESSION_FSYNC in ("always", "snapshot")
 
-        with (session_dir / "full.json").open("w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "messages": [
-                        {"role": m.role, "content": m.content} for m in memory.messages
-                    ],
-                    "context": memory.context,
-                },
-                f,
-                indent=2,
+        persisted = self._persisted.get(session_id)
+        if persisted is None:
+            journal = SessionJournal(session_dir)
+            data = journal.load()
+            persisted = self._track(session_id, journal, data)
+
+        journal = persisted.journal
+        message_count = request.offset + len(request.messages)
+        rewrite = not journal.exists() or message_count < persisted.message_count
+        # Everything not yet sealed is always in memory, so the new messages
+        # are a suffix of ``request.messages``.
+        new_messages = (
+            request.messages
+            if rewrite
+            else request.messages[persisted.message_count - request.offset :]
+        )
+        changed = [
+            name
+            for name, encoded in request.fields.items()
+            if encoded != persisted.fields.get(name)
+        ]
+        if rewrite:
+            persisted.segments.clear()
+            persisted.sealed = 0
+            self._write_snapshot(persisted, request, fsync_files)
+        else:
+            records: list[dict[str, Any]] = [
+                {"op": "message", "role": m.role, "content": m.content}
+                for m in new_messages
+            ]
+            for name in changed:
+                records.append({"op": name, "value": json.loads(request.fields[name])})
+            journal.append(records, fsync=fsync_journal)
+            persisted.message_count = message_count
+            persisted.fields = dict(request.fields)
+
+            # Amortized O(1): the snapshot is rewritten only after at least as
+            # many journal records as it holds messages.
+            if journal.records > max(
+                config.SESSION_SNAPSHOT_MIN_RECORDS, persisted.snapshot_size
+            ):
+                self._write_snapshot(persisted, request, fsync_files)
+
+        metadata = {
+            "session_id": session_id,
+            "created_at": request.created_at,
+            "last_updated": datetime.now(UTC).isoformat(),
+            "message_count": message_count,
+            "token_count": request.tokens_used,
+            "first_prompt": request.first_prompt,
+        }
+        atomic_write_text(
+            session_dir / "metadata.json",
+            json.dumps(metadata, indent=2),
+            fsync=fsync_journal,
+        )
+        self.catalog.upsert(metadata)
+        self._update_long_term(session_id, new_messages, request, changed)
+
+        if self._current_session != session_id:
+            atomic_write_text(
+                self.base_dir / "current_session", session_id, fsync=fsync_files
             )
+            self._current_session = session_id
 
-        with (session_dir / "working.json").open("w", encoding="utf-8") as f:
-            json.dump(memory.working_set, f, indent=2)
-
-        with (session_dir / "state.json").open("w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2)
-
-        with (session_dir / "metadata.json").open("w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "session_id": session_id,
-                    "created_at": state.get(
-                        "created_at", datetime.now(UTC).isoformat()
-                    ),
-                    "last_updated": datetime.now(UTC).isoformat(),
-                    "message_count": len(memory.messages),
-                    "token_count": state.get("tokens_used", 0),
-                },
-                f,
-                indent=2,
+    def _update_long_term(
+        self,
+        session_id: str,
+        new_messages: list[Message],
+        request: _SaveRequest,
+        changed: list[str],
+    ) -> None:
+        if self.long_term is None:
+            return
+        try:
+            self.long_term.add_messages(
+                session_id, [(m.role, m.content) for m in new_messages]
             )
+            if "working_set" in changed:
+                self.long_term.set_working_set(
+                    session_id, json.loads(request.fields["working_set"]) or {}
+                )
+        except sqlite3.Error as e:
+            console.print(f"[dim]⚠️  Could not update long-term memory: {e}[/dim]")
+
+    def _track(
+        self, session_id: str, journal: SessionJournal, data: dict[str, Any] | None
+    ) -> _Persisted:
+        segment_size = (data or {}).get("segment_size") or config.SESSION_SEGMENT_SIZE
+        persisted = _Persisted(
+            journal, MessageSegments(journal.dir / _SEGMENTS_DIR, segment_size)
+        )
+        if data is not None:
+            persisted.remember(data)
+        self._persisted[session_id] = persisted
+        return persisted
 
-        with (self.base_dir / "current_session").open("w", encoding="utf-8") as f:
-            f.write(session_id)
+    def _write_snapshot(
+        self, persisted: _Persisted, request: _SaveRequest, fsync: bool
+    ) -> None:
+        segments = persisted.segments
+        sealed = persisted.sealed
+        unsealed = [
+            {"role": m.role, "content": m.content}
+            for m in request.messages[max(sealed - request.offset, 0) :]
+        ]
+        # Segments go first: if we crash before the snapshot, the next seal
+        # simply rewrites them.
+        while len(unsealed) >= segments.size:
+            segments.write(sealed // segments.size, unsealed[: segments.size], fsync)
+            sealed += segments.size
+            unsealed = unsealed[segments.size :]
+
+        data: dict[str, Any] = {
+            "messages": unsealed,
+            "sealed": sealed,
+            "segment_size": segments.size,
+        }
+        for name, encoded in request.fields.items():
+            data[name] = json.loads(encoded)
+        persisted.journal.snapshot(data, fsync=fsync)
+        persisted.remember(data)
+        for legacy in _LEGACY_FILES:
+            (persisted.journal.dir / legacy).unlink(missing_ok=True)
 
     def load_session(self, session_id: str) -> tuple[SessionMemory, dict] | None:
+        self.flush()
         session_dir = self.sessions_dir / session_id
         if not session_dir.exists():
             return None
 
-        with (session_dir / "full.json").open(encoding="utf-8") as f:
-            data = json.load(f)
+        with self._io_lock:
+            journal = SessionJournal(session_dir)
+            data = journal.load()
+            if data is None:
+                data = self._load_legacy(session_dir)
+            else:
+                self._track(session_id, journal, data)
 
         memory = SessionMemory(session_id=session_id)
+        # Sealed history stays on disk; it is paged in through the loader.
+        # Attach it first so the unsealed tail is indexed at its real position.
+        if data["sealed"]:
+            memory.attach_history(
+                data["sealed"],
+                _segment_loader(
+                    MessageSegments(
+                        session_dir / _SEGMENTS_DIR,
+                        data.get("segment_size") or config.SESSION_SEGMENT_SIZE,
+                    )
+                ),
+            )
         for msg in data["messages"]:
             memory.add(msg["role"], msg["content"])
-        memory.context = data.get("context", {})
+        memory.context = data.get("context") or {}
+        if data.get("working_set") is not None:
+            memory.working_set = data["working_set"]
+            memory.evict_upto(memory.working_set.get("compacted_upto", 0))
+        if data["sealed"]:
+            memory.load_older(config.SESSION_EAGER_MESSAGES - len(memory.messages))
+
+        return memory, data.get("state") or {}
+
+    def _load_legacy(self, session_dir: Path) -> dict[str, Any]:
+        """Sessions saved before the journal: full.json + working/state files."""
+        data = empty_session_data()
+        with (session_dir / "full.json").open(encoding="utf-8") as f:
+            full = json.load(f)
+        data["messages"] = full["messages"]
+        data["context"] = full.get("context", {})
 
         working_file = session_dir / "working.json"
         if working_file.exists():
             with working_file.open(encoding="utf-8") as f:
-                memory.working_set = json.load(f)
+                data["working_set"] = json.load(f)
 
         with (session_dir / "state.json").open(encoding="utf-8") as f:
-            state = json.load(f)
+            data["state"] = json.load(f)
+        return data
+
+    def routing_cache(self) -> PersistentLRUCache:
+        return PersistentLRUCache(
+            self.base_dir / "routing_cache.json",
+            max_entries=config.ROUTING_CACHE_SIZE,
+            ttl_seconds=config.ROUTING_CACHE_TTL_HOURS * 3600,
+        )
 
-        return memory, state
+    def summary_cache(self) -> PersistentLRUCache | None:
+        if config.SUMMARY_CACHE_SIZE <= 0:
+            return None
+        return PersistentLRUCache(
+            self.base_dir / "summary_cache.json",
+            max_entries=config.SUMMARY_CACHE_SIZE,
+        )
 
     def get_last_session(self) -> str | None:
+        self.flush()
         current_file = self.base_dir / "current_session"
         if current_file.exists():
             session_id = current_file.read_text(encoding="utf-8").strip()
@@ -86,12 +420,16 @@ class SessionManager:
                 return session_id
         return None
 
-    def list_sessions(self) -> list[dict]:
-        sessions = []
-        for session_dir in self.sessions_dir.iterdir():
-            if session_dir.is_dir():
-                metadata_file = session_dir / "metadata.json"
-                if metadata_file.exists():
-                    with metadata_file.open(encoding="utf-8") as f:
-                        sessions.append(json.load(f))
-        return sorted(sessions, key=lambda x: x["last_updated"], reverse=True)
+    def list_sessions(
+        self, limit: int | None = None, offset: int = 0, search: str | None = None
+    ) -> list[dict]:
+        self.flush()
+        return self.catalog.list(limit=limit, offset=offset, search=search)
+
+    def count_sessions(self, search: str | None = None) -> int:
+        self.flush()
+        return self.catalog.count(search=search)
+
+    def rebuild_catalog(self) -> int:
+        self.flush()
+        return self.catalog.rebuild(self.sessions_dir)
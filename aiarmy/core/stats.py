@@ -0,0 +1,106 @@
+import sqlite3
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from .audit import _archive_partitions, _get_conn, _open_partition
+
+# Rows that stand for one model call: agent runs plus routing/planning calls.
+_MODEL_CALL = "tokens_used > 0 OR action_type = 'llm_call'"
+
+# Dimension -> (group key expression, row filter).
+DIMENSIONS: dict[str, tuple[str, str]] = {
+    "agent": ("agent", _MODEL_CALL),
+    "tool": ("action", "action_type = 'tool_call'"),
+    "model": ("model", f"model IS NOT NULL AND ({_MODEL_CALL})"),
+    "day": ("substr(ts, 1, 10)", _MODEL_CALL),
+    "session": ("session_id", _MODEL_CALL),
+}
+
+
+@dataclass
+class UsageRow:
+    key: str
+    calls: int = 0
+    tokens: int = 0
+    cache_read_tokens: int = 0
+    latency_total_ms: int = 0
+    latency_count: int = 0
+    latency_max_ms: int = 0
+
+    @property
+    def avg_latency_ms(self) -> float | None:
+        if not self.latency_count:
+            return None
+        return self.latency_total_ms / self.latency_count
+
+
+def _connections(since: str | None, include_archive: bool) -> Iterator[sqlite3.Connection]:
+    if include_archive:
+        for path in _archive_partitions(None, since):
+            yield _open_partition(path)
+    yield _get_conn()
+
+
+def usage_by(
+    dimension: str, since: str | None = None, include_archive: bool = False
+) -> list[UsageRow]:
+    """Calls, tokens and latency grouped by ``dimension``, costliest first.
+
+    Each partition is aggregated in SQL and the partial sums merged here, so
+    nothing is read row by row.
+    """
+    key_expr, condition = DIMENSIONS[dimension]
+    where = f"WHERE ({condition})"
+    params: list[Any] = []
+    if since is not None:
+        where += " AND ts >= ?"
+        params.append(since)
+    query = (
+        f"SELECT {key_expr}, COUNT(*), COALESCE(SUM(tokens_used), 0), "
+        "COALESCE(SUM(cache_read_tokens), 0), COALESCE(SUM(latency_ms), 0), "
+        "COUNT(latency_ms), COALESCE(MAX(latency_ms), 0) "
+        f"FROM audit_log {where} GROUP BY 1"
+    )
+
+    rows: dict[str, UsageRow] = {}
+    for conn in _connections(since, include_archive):
+        try:
+            for key, calls, tokens, cached, lat_sum, lat_count, lat_max in conn.execute(
+                query, params
+            ):
+                row = rows.setdefault(str(key), UsageRow(key=str(key)))
+                row.calls += calls
+                row.tokens += tokens
+                row.cache_read_tokens += cached
+                row.latency_total_ms += lat_sum
+                row.latency_count += lat_count
+                row.latency_max_ms = max(row.latency_max_ms, lat_max)
+        finally:
+            conn.close()
+    return sorted(rows.values(), key=lambda row: (row.tokens, row.calls), reverse=True)
+
+
+def top_tasks(
+    limit: int = 10, since: str | None = None, include_archive: bool = False
+) -> list[dict[str, Any]]:
+    """The ``limit`` most expensive agent runs by tokens."""
+    where = "WHERE action_type = 'llm_call'"
+    params: list[Any] = []
+    if since is not None:
+        where += " AND ts >= ?"
+        params.append(since)
+    query = (
+        "SELECT ts, session_id, agent, action, tokens_used, model, latency_ms "
+        f"FROM audit_log {where} ORDER BY tokens_used DESC LIMIT ?"
+    )
+    cols = ["ts", "session_id", "agent", "action", "tokens_used", "model", "latency_ms"]
+
+    found: list[dict[str, Any]] = []
+    for conn in _connections(since, include_archive):
+        try:
+            found.extend(dict(zip(cols, row)) for row in conn.execute(query, (*params, limit)))
+        finally:
+            conn.close()
+    found.sort(key=lambda row: row["tokens_used"], reverse=True)
+    return found[:limit]
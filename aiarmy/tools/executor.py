@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Generic, TypeVar
+
+from ..core.config import config
+from ..core.security import requires_hitl
+from .registry import get
+
+T = TypeVar("T")
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=config.TOOL_MAX_WORKERS,
+                thread_name_prefix="aiarmy-tool",
+            )
+        return _pool
+
+
+def is_parallel_safe(name: str) -> bool:
+    tool = get(name)
+    return tool is not None and tool.read_only and not requires_hitl(name)
+
+
+class ToolBatch(Generic[T]):
+    """Runs the tool_use blocks of one assistant turn.
+
+    Consecutive read-only tools run concurrently on a shared thread pool.
+    Mutating or HITL-gated tools act as barriers: they run alone, in order,
+    on the calling thread, so approval prompts and side effects keep the
+    same ordering as sequential execution. Results come back in block order.
+    """
+
+    def __init__(self, run: Callable[[Any], T]):
+        self._run = run
+        self._blocks: list[Any] = []
+        self._futures: dict[int, Future[T]] = {}
+        self._barrier_seen = False
+
+    def add(self, block: Any) -> None:
+        index = len(self._blocks)
+        self._blocks.append(block)
+        if not is_parallel_safe(block.name):
+            self._barrier_seen = True
+        elif not self._barrier_seen:
+            self._futures[index] = _get_pool().submit(self._run, block)
+
+    def results(self) -> list[T]:
+        results: list[T] = []
+        index = 0
+        while index < len(self._blocks):
+            if not is_parallel_safe(self._blocks[index].name):
+                results.append(self._run(self._blocks[index]))
+                index += 1
+                continue
+
+            end = index
+            while end < len(self._blocks) and is_parallel_safe(self._blocks[end].name):
+                if end not in self._futures:
+                    self._futures[end] = _get_pool().submit(
+                        self._run, self._blocks[end]
+                    )
+                end += 1
+            results.extend(self._futures[i].result() for i in range(index, end))
+            index = end
+        return results
+
+
+class AsyncToolBatch(Generic[T]):
+    """Event-loop counterpart of ToolBatch with the same ordering rules."""
+
+    def __init__(self, run: Callable[[Any], Awaitable[T]]):
+        self._run = run
+        self._blocks: list[Any] = []
+        self._tasks: dict[int, asyncio.Task[T]] = {}
+        self._barrier_seen = False
+
+    def add(self, block: Any) -> None:
+        index = len(self._blocks)
+        self._blocks.append(block)
+        if not is_parallel_safe(block.name):
+            self._barrier_seen = True
+        elif not self._barrier_seen:
+            self._tasks[index] = asyncio.ensure_future(self._run(block))
+
+    async def results(self) -> list[T]:
+        results: list[T] = []
+        index = 0
+        while index < len(self._blocks):
+            if not is_parallel_safe(self._blocks[index].name):
+                results.append(await self._run(self._blocks[index]))
+                index += 1
+                continue
+
+            end = index
+            while end < len(self._blocks) and is_parallel_safe(self._blocks[end].name):
+                if end not in self._tasks:
+                    self._tasks[end] = asyncio.ensure_future(
+                        self._run(self._blocks[end])
+                    )
+                end += 1
+            results.extend(
+                await asyncio.gather(*(self._tasks[i] for i in range(index, end)))
+            )
+            index = end
+        return results
@@ -21,6 +21,7 @@ register(
         name="file_read",
         description="Read a file from disk",
         fn=_read_file,
+        read_only=True,
         input_schema={
             "type": "object",
             "properties": {
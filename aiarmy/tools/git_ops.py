@@ -100,6 +100,7 @@ register(
         description="Get the status of a git repository",
         fn=_git_status,
         requires_hitl=False,
+        read_only=True,
         input_schema={
             "type": "object",
             "properties": {
@@ -119,6 +120,7 @@ register(
         description="Show git diff. Use staged=True to show staged changes only",
         fn=_git_diff,
         requires_hitl=False,
+        read_only=True,
         input_schema={
             "type": "object",
             "properties": {
@@ -238,6 +240,7 @@ register(
         description="Show git log with limited entries",
         fn=_git_log,
         requires_hitl=False,
+        read_only=True,
         input_schema={
             "type": "object",
             "properties": {
@@ -1,5 +1,6 @@
+import asyncio
 from dataclasses import dataclass, field
-from typing import Callable, Any
+from typing import Awaitable, Callable, Any
 
 
 @dataclass
@@ -8,6 +9,8 @@ class Tool:
     description: str
     fn: Callable[..., Any]
     requires_hitl: bool = False
+    read_only: bool = False
+    afn: Callable[..., Awaitable[Any]] | None = None
     input_schema: dict[str, Any] = field(
         default_factory=lambda: {"type": "object", "properties": {}}
     )
@@ -43,7 +46,7 @@ def get_tools_for_agent(allowed_tools: list[str]) -> list[dict[str, Any]]:
     ]
 
 
-def call(name: str, agent_allowed_tools: list[str], **kwargs: Any) -> Any:
+def _resolve(name: str, agent_allowed_tools: list[str]) -> Tool:
     if name not in agent_allowed_tools:
         raise PermissionError(
             f"Tool '{name}' is not in this agent's allowed tool list."
@@ -51,4 +54,15 @@ def call(name: str, agent_allowed_tools: list[str], **kwargs: Any) -> Any:
     tool = _registry.get(name)
     if not tool:
         raise KeyError(f"Tool '{name}' is not registered.")
-    return tool.fn(**kwargs)
+    return tool
+
+
+def call(name: str, agent_allowed_tools: list[str], **kwargs: Any) -> Any:
+    return _resolve(name, agent_allowed_tools).fn(**kwargs)
+
+
+async def acall(name: str, agent_allowed_tools: list[str], **kwargs: Any) -> Any:
+    tool = _resolve(name, agent_allowed_tools)
+    if tool.afn is not None:
+        return await tool.afn(**kwargs)
+    return await asyncio.to_thread(tool.fn, **kwargs)
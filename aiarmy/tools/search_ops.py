@@ -76,6 +76,7 @@ register(
         description="Search for files matching a glob pattern",
         fn=_glob_search,
         requires_hitl=False,
+        read_only=True,
         input_schema={
             "type": "object",
             "properties": {
@@ -99,6 +100,7 @@ register(
         description="Search for text pattern in files using grep",
         fn=_grep_search,
         requires_hitl=False,
+        read_only=True,
         input_schema={
             "type": "object",
             "properties": {
@@ -126,6 +128,7 @@ register(
         description="List directory contents with file sizes and types",
         fn=_directory_list,
         requires_hitl=False,
+        read_only=True,
         input_schema={
             "type": "object",
             "properties": {
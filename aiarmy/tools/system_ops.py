@@ -95,6 +95,7 @@ register(
         description="Read an environment variable",
         fn=_env_read,
         requires_hitl=False,
+        read_only=True,
         input_schema={
             "type": "object",
             "properties": {
@@ -1,3 +1,6 @@
+import asyncio
+import weakref
+
 import httpx
 from .registry import Tool, register
 
@@ -14,6 +17,32 @@ def _web_fetch(url: str, max_length: int = 10000) -> str:
         return f"Error: {str(e)}"
 
 
+_async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(follow_redirects=True, timeout=15)
+        _async_clients[loop] = client
+    return client
+
+
+async def _aweb_fetch(url: str, max_length: int = 10000) -> str:
+    """Async variant of _web_fetch; reuses one connection pool per event loop."""
+    try:
+        response = await _async_client().get(url)
+        response.raise_for_status()
+        return response.text[:max_length]
+    except httpx.HTTPError as e:
+        return f"Error fetching {url}: {str(e)}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
 def _web_search(query: str, num_results: int = 5) -> str:
     """Search the web using DuckDuckGo and return formatted results."""
     try:
@@ -42,7 +71,9 @@ register(
         name="web_fetch",
         description="Fetch content from a URL and return text",
         fn=_web_fetch,
+        afn=_aweb_fetch,
         requires_hitl=False,
+        read_only=True,
         input_schema={
             "type": "object",
             "properties": {
@@ -64,6 +95,7 @@ register(
         description="Search the web using DuckDuckGo",
         fn=_web_search,
         requires_hitl=False,
+        read_only=True,
         input_schema={
             "type": "object",
             "properties": {
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from aiarmy.core.session_journal import SessionJournal, empty_session_data
+
+
+def _message(content):
+    return {"op": "message", "role": "user", "content": content}
+
+
+def _started(session_dir):
+    journal = SessionJournal(session_dir)
+    journal.snapshot(empty_session_data())
+    journal.append([_message("one"), _message("two")])
+    return journal
+
+
+@pytest.mark.parametrize(
+    "torn", [b'{"op": "message", "ro', b'{"op": "message", "role":\n']
+)
+def test_load_drops_torn_tail(tmp_path, torn):
+    journal = _started(tmp_path)
+    intact = journal.journal_path.stat().st_size
+    with journal.journal_path.open("ab") as f:
+        f.write(torn)
+
+    reloaded = SessionJournal(tmp_path)
+    data = reloaded.load()
+
+    assert [m["content"] for m in data["messages"]] == ["one", "two"]
+    assert reloaded.records == 2
+    assert reloaded.journal_path.stat().st_size == intact
+
+    # Later appends start on a line boundary again.
+    reloaded.append([_message("three")])
+    data = SessionJournal(tmp_path).load()
+    assert [m["content"] for m in data["messages"]] == ["one", "two", "three"]
+
+
+def test_snapshot_starts_new_generation(tmp_path):
+    journal = _started(tmp_path)
+    old_journal = journal.journal_path
+    data = journal.load()
+
+    journal.snapshot(data)
+
+    assert journal.generation == 2
+    assert journal.records == 0
+    assert not old_journal.exists()
+    assert journal.journal_path != old_journal
+    snapshot = json.loads((tmp_path / "snapshot.json").read_text(encoding="utf-8"))
+    assert snapshot["generation"] == 2
+
+
+def test_journal_left_by_crash_after_snapshot_is_not_replayed(tmp_path):
+    journal = _started(tmp_path)
+    old_journal = journal.journal_path
+    leftover = old_journal.read_bytes()
+    data = journal.load()
+
+    journal.snapshot(data)
+    # As if the process died before the old journal was deleted.
+    old_journal.write_bytes(leftover)
+
+    data = SessionJournal(tmp_path).load()
+    assert [m["content"] for m in data["messages"]] == ["one", "two"]
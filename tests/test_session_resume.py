@@ -0,0 +1,30 @@
+from aiarmy.core.config import config
+from aiarmy.core.memory import SessionMemory
+from aiarmy.core.session_manager import SessionManager
+
+
+def test_resumed_session_matches_live_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SESSION_SEGMENT_SIZE", 10)
+    monkeypatch.setattr(config, "SESSION_SNAPSHOT_MIN_RECORDS", 1)
+    monkeypatch.setattr(config, "SESSION_EAGER_MESSAGES", 100)
+    monkeypatch.setattr(config, "SESSION_FSYNC", "never")
+    monkeypatch.setattr(config, "LTM_ENABLED", False)
+    manager = SessionManager(base_dir=tmp_path, background=False)
+
+    live = SessionMemory(session_id="s1")
+    # 66 messages: six segments sealed on disk plus an unsealed tail.
+    for n in range(33):
+        live.add_exchange(f"question about zebra{n}", f"answer on zebra{n}")
+    live.working_set["compacted_upto"] = 45
+    live.evict_upto(45)
+    manager.save_session("s1", live, {})
+
+    resumed, _ = manager.load_session("s1")
+
+    assert resumed.estimate_tokens() == live.estimate_tokens()
+    for query in ("zebra24", "zebra31", "zebra3"):
+        expected = live.relevant_context(query, max_tokens=40, recent_pairs=1)
+        assert resumed.relevant_context(query, max_tokens=40, recent_pairs=1) == expected
+    assert resumed.relevant_context("zebra31", max_tokens=40, recent_pairs=0)[
+        0
+    ].content == "question about zebra31"
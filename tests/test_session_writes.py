@@ -0,0 +1,51 @@
+import pytest
+
+from aiarmy.core import session_journal
+from aiarmy.core.config import config
+from aiarmy.core.memory import SessionMemory
+from aiarmy.core.session_journal import atomic_write_text
+from aiarmy.core.session_manager import SessionManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SESSION_SEGMENT_SIZE", 10)
+    monkeypatch.setattr(config, "SESSION_SNAPSHOT_MIN_RECORDS", 1)
+    monkeypatch.setattr(config, "SESSION_FSYNC", "never")
+    monkeypatch.setattr(config, "LTM_ENABLED", False)
+    return SessionManager(base_dir=tmp_path, background=True)
+
+
+def test_save_after_clear_rewrites_session(manager):
+    memory = SessionMemory(session_id="s1")
+    for n in range(15):
+        memory.add_exchange(f"question {n}", f"answer {n}")
+    manager.save_session("s1", memory, {})
+    manager.flush()
+    segments = manager.sessions_dir / "s1" / "segments"
+    assert list(segments.glob("seg-*.jsonl.gz"))
+
+    memory.clear()
+    memory.add_exchange("fresh start", "ok")
+    manager.save_session("s1", memory, {})
+    manager.flush()
+
+    assert not list(segments.glob("seg-*.jsonl.gz"))
+    resumed, _ = SessionManager(base_dir=manager.base_dir).load_session("s1")
+    assert [m.content for m in resumed.messages] == ["fresh start", "ok"]
+    assert resumed.offset == 0
+
+
+def test_atomic_write_keeps_old_file_when_replace_fails(tmp_path, monkeypatch):
+    path = tmp_path / "snapshot.json"
+    atomic_write_text(path, "old")
+
+    def crash(src, dst):
+        raise OSError("simulated crash")
+
+    monkeypatch.setattr(session_journal.os, "replace", crash)
+    with pytest.raises(OSError):
+        atomic_write_text(path, "new")
+    monkeypatch.undo()
+
+    assert path.read_text(encoding="utf-8") == "old"
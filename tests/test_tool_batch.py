@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from aiarmy.tools import registry
+from aiarmy.tools.executor import AsyncToolBatch, ToolBatch
+from aiarmy.tools.registry import Tool
+
+
+@pytest.fixture(autouse=True)
+def tools(monkeypatch):
+    for name, read_only in (("test_read", True), ("test_write", False)):
+        monkeypatch.setitem(
+            registry._registry,
+            name,
+            Tool(name=name, description="", fn=lambda: None, read_only=read_only),
+        )
+
+
+def _block(name, label):
+    return SimpleNamespace(name=name, id=label)
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def log(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def position(self, event):
+        return self.events.index(event)
+
+
+def test_results_come_back_in_block_order():
+    # Later blocks finish first.
+    delays = {"r1": 0.15, "r2": 0.1, "r3": 0.0}
+
+    def run(block):
+        time.sleep(delays[block.id])
+        return block.id
+
+    batch = ToolBatch(run)
+    for label in delays:
+        batch.add(_block("test_read", label))
+
+    assert batch.results() == ["r1", "r2", "r3"]
+
+
+def test_read_only_tools_run_concurrently():
+    # Both reads must be in flight at once to pass the barrier.
+    both_running = threading.Barrier(2, timeout=5)
+
+    def run(block):
+        both_running.wait()
+        return block.id
+
+    batch = ToolBatch(run)
+    batch.add(_block("test_read", "r1"))
+    batch.add(_block("test_read", "r2"))
+
+    assert batch.results() == ["r1", "r2"]
+
+
+def test_mutating_tool_is_a_barrier():
+    recorder = Recorder()
+    caller = threading.get_ident()
+    ran_on = {}
+
+    def run(block):
+        recorder.log(("start", block.id))
+        ran_on[block.id] = threading.get_ident()
+        time.sleep(0.05)
+        recorder.log(("end", block.id))
+        return block.id
+
+    batch = ToolBatch(run)
+    for name, label in (
+        ("test_read", "r1"),
+        ("test_read", "r2"),
+        ("test_write", "w"),
+        ("test_read", "r3"),
+    ):
+        batch.add(_block(name, label))
+    # Nothing after the barrier starts before results() is asked for.
+    time.sleep(0.1)
+    assert ("start", "w") not in recorder.events
+    assert ("start", "r3") not in recorder.events
+
+    assert batch.results() == ["r1", "r2", "w", "r3"]
+    start_w = recorder.position(("start", "w"))
+    assert recorder.position(("end", "r1")) < start_w
+    assert recorder.position(("end", "r2")) < start_w
+    assert recorder.position(("end", "w")) < recorder.position(("start", "r3"))
+    assert ran_on["w"] == caller
+
+
+def test_async_batch_keeps_barrier_and_result_order():
+    recorder = Recorder()
+
+    async def run(block):
+        recorder.log(("start", block.id))
+        await asyncio.sleep({"r1": 0.05, "r2": 0.0}.get(block.id, 0.01))
+        recorder.log(("end", block.id))
+        return block.id
+
+    async def main():
+        batch = AsyncToolBatch(run)
+        for name, label in (
+            ("test_read", "r1"),
+            ("test_read", "r2"),
+            ("test_write", "w"),
+            ("test_read", "r3"),
+        ):
+            batch.add(_block(name, label))
+        return await batch.results()
+
+    assert asyncio.run(main()) == ["r1", "r2", "w", "r3"]
+    start_w = recorder.position(("start", "w"))
+    assert recorder.position(("end", "r1")) < start_w
+    assert recorder.position(("end", "w")) < recorder.position(("start", "r3"))